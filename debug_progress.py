@@ -4,15 +4,27 @@
 调试进度显示问题
 """
 
+import asyncio
+import os
 import sys
 import time
 from pathlib import Path
-from video_audio_converter import VideoAudioConverter
+from video_audio_converter import VideoAudioConverter, _fast_stat
 
 def debug_progress_callback(current_time, total_time, percentage):
-    """调试进度回调"""
+    """调试进度回调（距上次刷新超过100ms或进度变化超过0.5%才输出）"""
+    now = time.monotonic()
+    if (percentage < 100
+            and now - debug_progress_callback.last_emit_ts <= 0.1
+            and abs(percentage - debug_progress_callback.last_pct) <= 0.5):
+        return
+    debug_progress_callback.last_emit_ts = now
+    debug_progress_callback.last_pct = percentage
     print(f"\r进度: {percentage:.1f}% | 时间: {current_time:.1f}s / {total_time:.1f}s", end='', flush=True)
 
+debug_progress_callback.last_emit_ts = 0.0
+debug_progress_callback.last_pct = -1.0
+
 def main():
     """调试主函数"""
     print("🔧 调试进度显示功能")
@@ -33,21 +45,23 @@ def main():
         print("❌ 未输入文件路径")
         return
         
-    input_path = Path(test_file)
-    if not input_path.exists():
+    if not os.path.exists(test_file):
         print(f"❌ 文件不存在: {test_file}")
         return
         
-    if not input_path.is_file():
+    is_file, suffix, dirname, stem = _fast_stat(test_file)
+    if not is_file:
         print(f"❌ 不是文件: {test_file}")
         return
     
     # 检查文件格式
-    if input_path.suffix.lower() not in converter.SUPPORTED_VIDEO_FORMATS:
-        print(f"❌ 不支持的格式: {input_path.suffix}")
+    if suffix not in converter.SUPPORTED_VIDEO_FORMATS:
+        print(f"❌ 不支持的格式: {suffix}")
         return
     
-    print(f"📹 测试文件: {input_path.name}")
+    # 校验通过后再转为Path传给转换器接口
+    input_path = Path(test_file)
+    print(f"📹 测试文件: {os.path.basename(test_file)}")
     
     # 测试获取视频时长
     print("🔍 测试获取视频时长...")
@@ -58,21 +72,22 @@ def main():
         print("⚠️ 无法获取视频时长，将使用估算进度")
     
     # 设置输出文件
-    output_path = input_path.parent / f"{input_path.stem}_debug.mp3"
+    output_name = f"{stem}_debug.mp3"
+    output_path = Path(dirname, output_name)
     
-    print(f"📁 输出文件: {output_path.name}")
+    print(f"📁 输出文件: {output_name}")
     print("🚀 开始转换测试...")
     print("-" * 50)
     
     # 开始转换
     start_time = time.time()
-    success = converter.convert_single_file(
+    success = asyncio.run(converter.convert_single_file_async(
         input_path=input_path,
         output_path=output_path,
         audio_format='mp3',
         bitrate='128k',
         progress_callback=debug_progress_callback
-    )
+    ))
     
     end_time = time.time()
     elapsed = end_time - start_time
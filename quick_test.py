@@ -4,15 +4,15 @@
 快速测试进度显示修复
 """
 
-import subprocess
 import sys
 from pathlib import Path
 
 def test_ffmpeg():
     """测试FFmpeg是否可用"""
     try:
-        result = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True, timeout=5)
-        if result.returncode == 0:
+        from video_audio_converter import _ffmpeg_info
+        
+        if _ffmpeg_info() is not None:
             print("✅ FFmpeg可用")
             return True
         else:
@@ -24,14 +24,14 @@ def test_ffmpeg():
 
 def test_duration_detection():
     """测试时长检测"""
-    from video_audio_converter import VideoAudioConverter
-    
-    converter = VideoAudioConverter()
-    
     # 让用户提供一个测试文件
     test_file = input("请输入一个视频文件路径进行测试（或按回车跳过）: ").strip().strip('"')
     
     if test_file and Path(test_file).exists():
+        # 只有真正需要检测时才导入转换器
+        from video_audio_converter import VideoAudioConverter
+        
+        converter = VideoAudioConverter()
         print(f"🔍 测试文件: {test_file}")
         duration = converter._get_video_duration(Path(test_file))
         if duration:
@@ -6,25 +6,39 @@ VideoAudio Batch Converter - GUI启动器
 
 使用方法:
     python run_gui.py
+    python run_gui.py --help
 """
 
 import sys
 import os
+import argparse
 
 # 添加当前目录到Python路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-try:
-    from video_audio_converter_gui import main
+
+def run():
+    """解析参数并启动GUI（GUI模块及其依赖只在真正启动时才导入）"""
+    parser = argparse.ArgumentParser(
+        description='VideoAudio Batch Converter - GUI启动器'
+    )
+    parser.parse_args()
     
-    if __name__ == '__main__':
-        print("🎬 启动 VideoAudio Batch Converter GUI...")
-        main()
+    print("🎬 启动 VideoAudio Batch Converter GUI...")
+    
+    try:
+        from video_audio_converter_gui import main
+    except ImportError as e:
+        print(f"❌ 导入错误: {e}")
+        print("请确保所有依赖已安装: pip install -r requirements.txt")
+        sys.exit(1)
         
-except ImportError as e:
-    print(f"❌ 导入错误: {e}")
-    print("请确保所有依赖已安装: pip install -r requirements.txt")
-    sys.exit(1)
-except Exception as e:
-    print(f"❌ 启动失败: {e}")
-    sys.exit(1)
\ No newline at end of file
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ 启动失败: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    run()
@@ -4,19 +4,112 @@
 测试实时进度显示功能
 """
 
+import os
+import sys
 import time
+import queue
+import logging
+import threading
+import contextlib
+from collections import OrderedDict
 from pathlib import Path
-from video_audio_converter import VideoAudioConverter
+from video_audio_converter import VideoAudioConverter, _available_cpus
 
-def test_file_progress_callback(filename, current_time, total_time, percentage):
-    """测试文件级进度回调"""
-    print(f"文件: {filename}")
-    print(f"进度: {percentage:.1f}%")
+# 各转换线程的进度事件和转换期间的其他输出统一交给打印线程输出
+progress_queue = queue.Queue()
+
+def test_file_progress_callback(file_path, current_time, total_time, percentage):
+    """测试文件级进度回调（只入队，由打印线程输出）"""
+    progress_queue.put(("progress", (file_path, percentage, current_time, total_time)))
+
+class QueueStream:
+    """把写入的文本交给打印线程，避免 print/tqdm/日志 与原地刷新的进度行互相覆盖"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        
+    def write(self, text):
+        if text:
+            progress_queue.put(("text", (id(self), text)))
+        return len(text)
+        
+    def flush(self):
+        pass
+        
+    def isatty(self):
+        # tqdm 根据 stderr 是否为终端决定是否显示进度条
+        return self.stream.isatty()
+
+def format_progress_line(label, percentage, current_time, total_time):
+    """格式化单个文件的进度行（label 过长时保留末尾，文件名总是可见）"""
+    line = f"{label[-40:]:<40} {percentage:5.1f}%"
     if total_time > 0:
         current_min, current_sec = divmod(int(current_time), 60)
         total_min, total_sec = divmod(int(total_time), 60)
-        print(f"时间: {current_min:02d}:{current_sec:02d} / {total_min:02d}:{total_sec:02d}")
-    print("-" * 40)
+        line += f"  {current_min:02d}:{current_sec:02d} / {total_min:02d}:{total_sec:02d}"
+    return line
+
+def progress_printer(out, max_active, base_dir):
+    """
+    打印线程：正在转换的文件各占一行，通过光标上移原地刷新（最多每100ms重绘一次）
+    
+    各行按文件完整路径区分，显示相对 base_dir 的路径，不同子目录中的同名文件各占一行。
+    
+    完成的文件输出最终一行后移出刷新区域；最多同时转换 max_active 个文件，
+    有新文件出现而区域已满时，最早的一行（已结束或失败）同样固定下来，
+    刷新区域不会随文件总数增长。其他文本输出在刷新区域之上，
+    每个输出流未换行的部分（tqdm 用 \\r 原地刷新的进度条）分别显示在区域末尾。
+    """
+    active = OrderedDict()  # 文件路径 -> 进度行
+    finished = []           # 待输出到刷新区域之上的固定行
+    done = set()            # 已完成的文件，忽略之后重复的100%事件
+    status = {}             # 输出流 -> 未换行的文本（进度条）
+    rendered = 0
+    last_draw = 0.0
+    
+    while True:
+        item = progress_queue.get()
+        if item is None:
+            force = True
+        else:
+            kind, data = item
+            force = False
+            if kind == "text":
+                source, text = data
+                lines = (status.get(source, "") + text).split('\n')
+                # \r 表示回到行首重写，只保留最后一次写入的内容
+                finished.extend(line.rsplit('\r', 1)[-1] for line in lines[:-1])
+                status[source] = lines[-1].rsplit('\r', 1)[-1]
+                force = len(lines) > 1
+            elif data[0] in done:
+                continue
+            else:
+                file_path, percentage = data[0], data[1]
+                line = format_progress_line(os.path.relpath(file_path, base_dir), *data[1:])
+                if percentage >= 100:
+                    active.pop(file_path, None)
+                    done.add(file_path)
+                    finished.append(line)
+                    force = True
+                else:
+                    if file_path not in active:
+                        if len(active) >= max_active:
+                            finished.append(active.popitem(last=False)[1])
+                        force = True
+                    active[file_path] = line
+                    
+        now = time.monotonic()
+        if force or now - last_draw > 0.1:
+            last_draw = now
+            region = list(active.values()) + [text for text in status.values() if text]
+            out.write('\x1b[F' * rendered +
+                      ''.join(f"\x1b[2K{line}\n" for line in finished + region))
+            out.flush()
+            finished.clear()
+            rendered = len(region)
+            
+        if item is None:
+            break
 
 def main():
     """测试主函数"""
@@ -52,16 +145,34 @@ def main():
     print("🚀 开始转换测试...")
     print("=" * 50)
     
-    # 开始转换，使用文件级进度回调
-    success, total, duplicates = converter.batch_convert(
-        input_path=test_path,
-        output_directory=output_dir,
-        audio_format='mp3',
-        bitrate='128k',  # 使用较低比特率加快测试
-        recursive=True,
-        max_workers=1,  # 使用单线程便于观察进度
-        file_progress_callback=test_file_progress_callback
-    )
+    # 开始转换，使用文件级进度回调；转换期间的 stdout/stderr 和控制台日志都经打印线程输出
+    max_workers = _available_cpus()  # 多文件并行，进度由打印线程逐行显示
+    real_stdout = sys.stdout
+    base_dir = path_obj if path_obj.is_dir() else path_obj.parent
+    printer = threading.Thread(target=progress_printer, args=(real_stdout, max_workers, base_dir),
+                               daemon=True)
+    printer.start()
+    console_handlers = [h for h in logging.getLogger().handlers
+                        if getattr(h, 'stream', None) in (sys.stdout, sys.stderr)]
+    saved_streams = [h.setStream(QueueStream(h.stream)) for h in console_handlers]
+    try:
+        with contextlib.redirect_stdout(QueueStream(sys.stdout)), \
+                contextlib.redirect_stderr(QueueStream(sys.stderr)):
+            success, total, duplicates = converter.batch_convert(
+                input_path=test_path,
+                output_directory=output_dir,
+                audio_format='mp3',
+                bitrate='128k',  # 使用较低比特率加快测试
+                recursive=True,
+                max_workers=max_workers,
+                file_progress_callback=test_file_progress_callback,
+                max_duration=30  # 每个文件最多转换30秒，测试耗时与输入长度无关
+            )
+    finally:
+        for handler, stream in zip(console_handlers, saved_streams):
+            handler.setStream(stream)
+        progress_queue.put(None)
+        printer.join()
     
     print("=" * 50)
     print("🎉 测试完成!")
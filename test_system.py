@@ -7,81 +7,77 @@ VideoAudio Batch Converter - 测试脚本
 
 import sys
 import os
+import io
+import argparse
+import functools
+import importlib.util
+import tempfile
 from pathlib import Path
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
-def test_python_version():
+def test_python_version(out=sys.stdout):
     """测试Python版本"""
-    print("🐍 检查Python版本...")
+    print("🐍 检查Python版本...", file=out)
     version = sys.version_info
     if version.major >= 3 and version.minor >= 8:
-        print(f"   ✅ Python {version.major}.{version.minor}.{version.micro} - 版本符合要求")
+        print(f"   ✅ Python {version.major}.{version.minor}.{version.micro} - 版本符合要求", file=out)
         return True
     else:
-        print(f"   ❌ Python {version.major}.{version.minor}.{version.micro} - 需要Python 3.8+")
+        print(f"   ❌ Python {version.major}.{version.minor}.{version.micro} - 需要Python 3.8+", file=out)
         return False
 
-def test_dependencies():
-    """测试依赖包"""
-    print("\n📦 检查依赖包...")
+def test_dependencies(out=sys.stdout, verbose=False):
+    """测试依赖包（只查找模块，不执行导入；verbose时才导入tqdm读取版本）"""
+    print("\n📦 检查依赖包...", file=out)
     
     # 测试tqdm
-    try:
-        import tqdm
-        print(f"   ✅ tqdm {tqdm.__version__} - 已安装")
-    except ImportError:
-        print("   ❌ tqdm - 未安装，请运行: pip install tqdm")
+    if importlib.util.find_spec('tqdm') is None:
+        print("   ❌ tqdm - 未安装，请运行: pip install tqdm", file=out)
         return False
+    if verbose:
+        import tqdm
+        print(f"   ✅ tqdm {tqdm.__version__} - 已安装", file=out)
+    else:
+        print("   ✅ tqdm - 已安装", file=out)
     
     # 测试标准库
-    try:
-        import pathlib, configparser, argparse, logging, subprocess
-        print("   ✅ 标准库 - 已导入")
-    except ImportError as e:
-        print(f"   ❌ 标准库导入失败: {e}")
+    missing = [name for name in ('pathlib', 'configparser', 'argparse', 'logging', 'subprocess')
+               if importlib.util.find_spec(name) is None]
+    if missing:
+        print(f"   ❌ 标准库缺失: {', '.join(missing)}", file=out)
         return False
+    print("   ✅ 标准库 - 可用", file=out)
     
     return True
 
-def test_ffmpeg():
+def test_ffmpeg(out=sys.stdout):
     """测试FFmpeg可用性"""
-    print("\n🎬 检查FFmpeg...")
+    print("\n🎬 检查FFmpeg...", file=out)
     
     try:
-        result = subprocess.run(
-            ['ffmpeg', '-version'],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
+        from video_audio_converter import _ffmpeg_info
         
-        if result.returncode == 0:
-            # 提取版本信息
-            lines = result.stdout.split('\n')
-            version_line = lines[0] if lines else "ffmpeg"
-            print(f"   ✅ {version_line}")
-            return True
-        else:
-            print("   ❌ FFmpeg调用失败")
+        info = _ffmpeg_info()
+        if info is None:
+            print("   ❌ FFmpeg未找到或调用失败", file=out)
+            print("   💡 请安装FFmpeg:", file=out)
+            print("      Windows: choco install ffmpeg", file=out)
+            print("      macOS:   brew install ffmpeg", file=out) 
+            print("      Linux:   sudo apt install ffmpeg", file=out)
             return False
             
-    except subprocess.TimeoutExpired:
-        print("   ❌ FFmpeg调用超时")
-        return False
-    except FileNotFoundError:
-        print("   ❌ FFmpeg未找到")
-        print("   💡 请安装FFmpeg:")
-        print("      Windows: choco install ffmpeg")
-        print("      macOS:   brew install ffmpeg") 
-        print("      Linux:   sudo apt install ffmpeg")
-        return False
+        # 提取版本信息
+        _, version_line = info
+        print(f"   ✅ {version_line}", file=out)
+        return True
+            
     except Exception as e:
-        print(f"   ❌ FFmpeg检查出错: {e}")
+        print(f"   ❌ FFmpeg检查出错: {e}", file=out)
         return False
 
-def test_converter_import():
+def test_converter_import(out=sys.stdout):
     """测试转换器模块导入"""
-    print("\n🔧 测试转换器模块...")
+    print("\n🔧 测试转换器模块...", file=out)
     
     try:
         # 添加当前目录到路径
@@ -93,63 +89,160 @@ def test_converter_import():
         
         # 创建实例
         converter = VideoAudioConverter()
-        print("   ✅ 转换器模块 - 导入成功")
-        print("   ✅ 转换器实例 - 创建成功")
+        print("   ✅ 转换器模块 - 导入成功", file=out)
+        print("   ✅ 转换器实例 - 创建成功", file=out)
         
         # 测试配置
         if converter.config:
-            print("   ✅ 配置系统 - 加载成功")
+            print("   ✅ 配置系统 - 加载成功", file=out)
         
         return True
         
     except Exception as e:
-        print(f"   ❌ 转换器模块测试失败: {e}")
+        print(f"   ❌ 转换器模块测试失败: {e}", file=out)
         return False
 
-def test_file_system():
+def test_file_system(out=sys.stdout):
     """测试文件系统权限"""
-    print("\n📁 测试文件系统...")
+    print("\n📁 测试文件系统...", file=out)
     
     try:
         # 测试当前目录写权限
         test_file = Path("test_write.tmp")
         test_file.write_text("test")
         test_file.unlink()
-        print("   ✅ 写权限 - 正常")
+        print("   ✅ 写权限 - 正常", file=out)
         
         # 测试logs目录创建
         logs_dir = Path("logs")
         logs_dir.mkdir(exist_ok=True)
-        print("   ✅ logs目录 - 创建成功")
+        print("   ✅ logs目录 - 创建成功", file=out)
+        
+        # 测试时长缓存目录写权限
+        from video_audio_converter import DURATION_CACHE_FILE
+        cache_dir = DURATION_CACHE_FILE.parent
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        test_cache = cache_dir / "test_write.tmp"
+        test_cache.write_text("test")
+        test_cache.unlink()
+        print(f"   ✅ 时长缓存目录 - 可写 ({cache_dir})", file=out)
         
         return True
         
     except Exception as e:
-        print(f"   ❌ 文件系统测试失败: {e}")
+        print(f"   ❌ 文件系统测试失败: {e}", file=out)
         return False
 
-def run_all_tests():
-    """运行所有测试"""
+def test_directory_scan(out=sys.stdout):
+    """测试目录扫描（扩展名像视频文件的目录也要递归进入）"""
+    print("\n🔎 测试目录扫描...", file=out)
+    
+    try:
+        from video_audio_converter import VideoAudioConverter
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "clips.mp4").mkdir()
+            (root / "clips.mp4" / "inner.mp4").write_bytes(b"inner")
+            (root / "top.avi").write_bytes(b"top")
+            (root / "notes.txt").write_text("notes")
+            
+            converter = VideoAudioConverter()
+            found = sorted(os.path.relpath(entry.path, tmp)
+                           for entry in converter._iter_video_files(tmp, recursive=True))
+            expected = sorted([os.path.join("clips.mp4", "inner.mp4"), "top.avi"])
+            if found != expected:
+                print(f"   ❌ 递归扫描结果不对: {found}，应为 {expected}", file=out)
+                return False
+            print("   ✅ 递归扫描 - 名为 clips.mp4 的目录已进入", file=out)
+            
+            found = [entry.name for entry in converter._iter_video_files(tmp, recursive=False)]
+            if found != ["top.avi"]:
+                print(f"   ❌ 非递归扫描结果不对: {found}", file=out)
+                return False
+            print("   ✅ 非递归扫描 - 只返回顶层视频文件", file=out)
+            
+        return True
+        
+    except Exception as e:
+        print(f"   ❌ 目录扫描测试失败: {e}", file=out)
+        return False
+
+def test_stderr_filter(out=sys.stdout):
+    """测试FFmpeg日志级别解析（只保留错误级别的行）"""
+    print("\n📝 测试FFmpeg日志过滤...", file=out)
+    
+    try:
+        from collections import deque
+        from video_audio_converter import VideoAudioConverter
+        
+        samples = [
+            (b"[info] Press [q] to stop, [?] for help", False),
+            (b"[aac @ 0x55d0c0] [warning] Queue input is backward in time", False),
+            (b"[aist#0:0/aac @ 0x55d0c0] [dec:aac @ 0x55e0a0] [info] Decoder thread received EOF", False),
+            (b"[out#0/mp3 @ 0x55d0c0] [info] video:0KiB audio:79KiB", False),
+            (b"[out#0/mp3 @ 0x55d0c0] [error] Error opening output file out/bad.mp3.", True),
+            (b"[aist#0:0/aac @ 0x55d0c0] [dec:aac @ 0x55e0a0] [error] Invalid data found", True),
+            (b"[fatal] Error opening output files: Invalid argument", True),
+            (b"[error] Option [q] not found", True),
+            (b"Some line without a level tag", True),
+        ]
+        for line, expected in samples:
+            tail = deque()
+            VideoAudioConverter._collect_stderr(line, tail)
+            if bool(tail) != expected:
+                print(f"   ❌ {'应保留' if expected else '不应保留'}: {line.decode()}", file=out)
+                return False
+        print(f"   ✅ 日志级别解析 - {len(samples)} 条样例全部正确（包括多层上下文前缀）", file=out)
+        return True
+        
+    except Exception as e:
+        print(f"   ❌ 日志过滤测试失败: {e}", file=out)
+        return False
+
+def run_all_tests(verbose=False):
+    """
+    运行所有测试
+    
+    Args:
+        verbose: 是否显示依赖包版本等详细信息
+    """
     print("🧪 VideoAudio Batch Converter - 系统测试")
     print("=" * 50)
     
     tests = [
         ("Python版本", test_python_version),
-        ("依赖包", test_dependencies), 
+        ("依赖包", functools.partial(test_dependencies, verbose=verbose)), 
         ("FFmpeg", test_ffmpeg),
         ("转换器模块", test_converter_import),
-        ("文件系统", test_file_system)
+        ("文件系统", test_file_system),
+        ("目录扫描", test_directory_scan),
+        ("日志过滤", test_stderr_filter)
     ]
     
     passed = 0
     total = len(tests)
     
-    for test_name, test_func in tests:
+    # 各项测试相互独立，并发执行；每项测试写入自己的输出缓冲，按原顺序打印。
+    # 不替换 sys.stdout，测试中创建的转换器日志处理器仍然写到真正的控制台
+    def run_test(test_name, test_func):
+        out = io.StringIO()
         try:
-            if test_func():
-                passed += 1
+            result = bool(test_func(out))
         except Exception as e:
-            print(f"   ❌ {test_name}测试异常: {e}")
+            print(f"   ❌ {test_name}测试异常: {e}", file=out)
+            result = False
+        return result, out.getvalue()
+    
+    with ThreadPoolExecutor(max_workers=total) as executor:
+        futures = [executor.submit(run_test, test_name, test_func)
+                   for test_name, test_func in tests]
+        results = [future.result() for future in futures]
+        
+    for result, output in results:
+        sys.stdout.write(output)
+        if result:
+            passed += 1
     
     print("\n" + "=" * 50)
     print(f"📊 测试结果: {passed}/{total} 项通过")
@@ -164,5 +257,9 @@ def run_all_tests():
         return False
 
 if __name__ == '__main__':
-    success = run_all_tests()
+    parser = argparse.ArgumentParser(description='VideoAudio Batch Converter - 系统测试')
+    parser.add_argument('-v', '--verbose', action='store_true', help='显示依赖包版本等详细信息')
+    args = parser.parse_args()
+    
+    success = run_all_tests(args.verbose)
     sys.exit(0 if success else 1)
\ No newline at end of file
@@ -12,28 +12,406 @@ VideoAudio Batch Converter - 视频转音频批量处理工具
 import os
 import sys
 import argparse
+import asyncio
+import atexit
+import functools
 import logging
+import pickle
+import shutil
+import stat
 import subprocess
 import configparser
 import hashlib
 import re
+from collections import OrderedDict, deque
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple, Optional, Dict, Set
+from typing import Iterator, List, Tuple, Optional, Dict, Set, Sequence, Union
 from tqdm import tqdm
 import time
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+try:
+    # 可选依赖: xxHash3 比MD5快一个数量级，重复检测不需要密码学强度
+    import xxhash
+    _new_hasher = xxhash.xxh3_128
+    _HASH_NAME = 'xxh3_128'
+except ImportError:
+    try:
+        # 可选依赖: BLAKE3 使用SIMD指令，同样远快于MD5和标准库的BLAKE2
+        import blake3
+        _new_hasher = blake3.blake3
+        _HASH_NAME = 'blake3'
+    except ImportError:
+        # 标准库中最快的128位摘要；从预先初始化好的空对象复制，
+        # 省去每个文件重新解析参数和初始化状态的开销
+        _new_hasher = hashlib.blake2b(digest_size=16).copy
+        _HASH_NAME = 'blake2b'
+
+
+# Linux等平台支持为文件读取提供访问模式提示
+_HAS_FADVISE = hasattr(os, 'posix_fadvise')
+
+
+def _drop_page_cache(path: Path):
+    """提示内核释放文件的页缓存（只用于之后不会再读取的文件，如已确认的重复文件）"""
+    if not _HAS_FADVISE:
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _available_cpus() -> int:
+    """
+    当前进程实际可用的CPU核心数
+    
+    taskset、容器的cpuset等限制了CPU亲和性时，os.cpu_count() 仍返回整机核心数，
+    按它启动的线程和FFmpeg进程会挤在少数几个核心上。
+    """
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except (AttributeError, OSError):
+        # Windows和macOS没有 sched_getaffinity
+        return os.cpu_count() or 1
+
+# 每个线程复用的哈希读取缓冲区，避免每次读取都分配新的bytes对象
+_hash_buffers = threading.local()
+
+
+def _hash_buffer(size: int) -> memoryview:
+    """获取当前线程的哈希读取缓冲区（大小变化时重新分配）"""
+    view = getattr(_hash_buffers, 'view', None)
+    if view is None or len(view) != size:
+        view = _hash_buffers.view = memoryview(bytearray(size))
+    return view
+
+
+# FFmpeg -progress 输出中的当前处理时间记录 (单位: 微秒)
+_PROGRESS_RE = re.compile(rb'out_time_us=(\d+)')
+
+# 文件名清理: 需要移除或替换的特殊字符
+# Windows 文件名不允许的字符: < > : " | ? * \ /，以及其他可能导致问题的全角字符
+_FILENAME_TRANS = str.maketrans({
+    '<': '',
+    '>': '',
+    ':': '-',
+    '"': '',
+    '|': '-',
+    '?': '',
+    '*': '',
+    '\\': '',
+    '/': '-',
+    '【': '[',
+    '】': ']',
+    '（': '(',
+    '）': ')',
+    '？': '',
+    '！': '',
+    '：': '-',
+    '；': '',
+    '，': ',',
+    '。': '.',
+    '、': '',
+    '～': '-',
+    '…': '...',
+    '—': '-',
+    '–': '-',
+    '\u2018': "'",  # 中文单引号
+    '\u2019': "'",
+    '\u201c': '',   # 中文双引号（和英文双引号一样不能出现在Windows文件名中）
+    '\u201d': '',
+})
+_SPACES_RE = re.compile(r'\s+')
+_DASHES_RE = re.compile(r'[-_]+')
+_DOTS_RE = re.compile(r'\.+')
+
+# ffmpeg -i 输出中音频流的编码名称 (例如: Stream #0:1(und): Audio: aac (LC) ...)
+_AUDIO_CODEC_RE = re.compile(r'Stream #.*?: Audio: (\w+)')
+
+# ffmpeg -i 输出中的时长 (例如: Duration: 00:01:23.45, start: ...)，N/A 不会匹配
+_DURATION_RE = re.compile(r'Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)')
+
+# -loglevel level+info 输出的日志级别标签，前面可以有多层上下文前缀
+# (例如: [info] ...、[aac @ 0x55d0] [error] ... 或 [aist#0:0/aac @ 0x55d0] [dec:aac @ 0x55e0] [info] ...)
+# 前缀非贪婪匹配：取第一个只由单词字符组成的标签，消息正文中的 [q] 之类不会被当成级别
+_LOG_LEVEL_RE = re.compile(rb'(?:\[[^\]]*\] )*?\[(\w+)\] ')
+# 转换失败时需要保留的日志级别（与 -loglevel error 输出的内容一致）
+_ERROR_LOG_LEVELS = frozenset({b'error', b'fatal', b'panic'})
+
+# 视频时长缓存文件（跨运行复用探测结果）
+DURATION_CACHE_FILE = Path.home() / '.cache' / 'video_audio_converter' / 'durations.pkl'
+
+# 文件哈希缓存文件（文件名带算法名，切换算法后不会混用旧结果）
+HASH_CACHE_FILE = DURATION_CACHE_FILE.with_name(f'hashes_{_HASH_NAME}.pkl')
+PARTIAL_HASH_CACHE_FILE = DURATION_CACHE_FILE.with_name(f'sampled_hashes_{_HASH_NAME}.pkl')
+
+# 音频编码探测缓存文件
+AUDIO_CODEC_CACHE_FILE = DURATION_CACHE_FILE.with_name('audio_codecs.pkl')
+
+
+def _stat_cached(cache_file: Optional[Path] = None, maxsize: int = 1024):
+    """
+    按 (文件路径, 修改时间, 文件大小) 缓存方法结果的装饰器
+    
+    文件被修改后键随之变化，旧结果自然失效。结果为None时不缓存。
+    路径之后的其他参数原样传给被装饰的方法但不参与缓存键，
+    只能用于不改变结果的选项（如读取块大小）。调用方已经取得文件状态时
+    可以用关键字参数 st 传入，不再重复stat。
+    
+    Args:
+        cache_file: 持久化缓存文件，进程退出时写入，首次调用时读取
+        maxsize: 最多保留的条目数（LRU淘汰）
+    """
+    def decorator(func):
+        cache: OrderedDict = OrderedDict()
+        lock = threading.Lock()
+        state = {'loaded': cache_file is None, 'dirty': False}
+        
+        def load():
+            try:
+                with open(cache_file, 'rb') as f:
+                    cache.update(pickle.load(f))
+            except Exception:
+                pass  # 缓存不存在或已损坏，从空缓存开始
+            state['loaded'] = True
+            
+        def save():
+            if not state['dirty']:
+                return
+            try:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(cache_file, 'wb') as f:
+                    pickle.dump(dict(cache), f)
+            except Exception:
+                pass  # 写缓存失败不影响程序退出
+                
+        @functools.wraps(func)
+        def wrapper(self, path: Path, *args, st: Optional[os.stat_result] = None, **kwargs):
+            if st is None:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    return func(self, path, *args, **kwargs)
+            key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+            
+            with lock:
+                if not state['loaded']:
+                    load()
+                if key in cache:
+                    cache.move_to_end(key)
+                    return cache[key]
+                    
+            result = func(self, path, *args, **kwargs)
+            
+            if result is not None:
+                with lock:
+                    cache[key] = result
+                    while len(cache) > maxsize:
+                        cache.popitem(last=False)
+                    state['dirty'] = True
+            return result
+            
+        if cache_file is not None:
+            atexit.register(save)
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+@functools.lru_cache(maxsize=None)
+def _ffmpeg_info(ffmpeg_path: str = 'ffmpeg') -> Optional[Tuple[str, str]]:
+    """
+    解析FFmpeg/FFprobe可执行文件并读取版本信息
+    
+    可执行文件在一次运行中不会变化，每个路径只探测一次，后续调用直接返回缓存结果。
+    
+    Args:
+        ffmpeg_path: 可执行文件名或完整路径
+        
+    Returns:
+        (可执行文件完整路径, 版本信息首行)，不可用时返回None
+    """
+    resolved = shutil.which(ffmpeg_path)
+    if resolved is None:
+        return None
+        
+    try:
+        result = subprocess.run(
+            [resolved, '-version'],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='ignore',  # 忽略编码错误
+            timeout=10
+        )
+    except (subprocess.TimeoutExpired, OSError):
+        return None
+        
+    if result.returncode != 0:
+        return None
+        
+    lines = result.stdout.splitlines()
+    return resolved, lines[0] if lines else ffmpeg_path
+
+
+@functools.lru_cache(maxsize=None)
+def _find_ffprobe(ffmpeg_path: str = 'ffmpeg') -> Optional[str]:
+    """
+    查找与FFmpeg配套的FFprobe，每个ffmpeg_path只查找一次
+    
+    优先使用与ffmpeg同目录的ffprobe，其次使用系统PATH中的ffprobe。
+    
+    Args:
+        ffmpeg_path: 配置中的FFmpeg路径
+        
+    Returns:
+        可用的FFprobe完整路径，找不到时返回None
+    """
+    candidates = []
+    if 'ffmpeg' in ffmpeg_path.lower():
+        # 如果ffmpeg_path包含完整路径，尝试在同目录找ffprobe
+        ffmpeg_dir = Path(ffmpeg_path).parent
+        candidates.extend([
+            ffmpeg_dir / 'ffprobe.exe',
+            ffmpeg_dir / 'ffprobe',
+            Path(ffmpeg_path.replace('ffmpeg.exe', 'ffprobe.exe')),
+            Path(ffmpeg_path.replace('ffmpeg', 'ffprobe'))
+        ])
+    # 添加系统PATH中的ffprobe
+    candidates.extend(['ffprobe.exe', 'ffprobe'])
+    
+    for candidate in candidates:
+        info = _ffmpeg_info(str(candidate))
+        # 路径替换没有生效时候选项仍是ffmpeg本身，按版本信息区分
+        if info is not None and info[1].startswith('ffprobe'):
+            return info[0]
+    return None
+
+
+def _fast_stat(path_str: str) -> Tuple[bool, str, str, str]:
+    """
+    一次 os.stat 加字符串操作得到文件校验所需信息，不创建Path对象
+    
+    Args:
+        path_str: 文件路径字符串
+        
+    Returns:
+        (是否为普通文件, 小写扩展名, 所在目录, 不含扩展名的文件名)
+    """
+    try:
+        isfile = stat.S_ISREG(os.stat(path_str).st_mode)
+    except (OSError, ValueError):
+        isfile = False
+    dirname, basename = os.path.split(path_str)
+    stem, ext = os.path.splitext(basename)
+    return isfile, ext.lower(), dirname, stem
+
+
+class _ProgressTracker:
+    """把FFmpeg -progress 输出的 key=value 记录转换为进度回调"""
+    
+    def __init__(self, progress_callback, total_duration: Optional[float]):
+        """
+        Args:
+            progress_callback: 进度回调函数，接收 (current_time, total_time, percentage) 参数
+            total_duration: 视频总时长（秒），未知时为None
+        """
+        self.progress_callback = progress_callback
+        self.total_duration = total_duration
+        self.start_time = time.time()
+        self.last_reported_time = 0
+        
+    def feed(self, line: bytes):
+        """处理一行进度记录 (格式: out_time_us=83450000)"""
+        # 先用字节子串判断快速跳过其他记录
+        if b'out_time_us=' not in line:
+            return
+            
+        # 转换刚开始时值为 N/A，不匹配
+        match = _PROGRESS_RE.match(line)
+        if match is None:
+            return
+        current_time = int(match.group(1)) / 1e6
+            
+        # 避免重复报告相同的时间
+        if current_time <= self.last_reported_time:
+            return
+        self.last_reported_time = current_time
+        
+        if self.total_duration and self.total_duration > 0:
+            # 有总时长，显示准确进度
+            percentage = min((current_time / self.total_duration) * 100, 100)
+            self.progress_callback(current_time, self.total_duration, percentage)
+        else:
+            # 没有总时长，基于处理时间估算
+            elapsed_real_time = time.time() - self.start_time
+            # 假设转换速度约为1:1到2:1
+            estimated_total = max(current_time * 1.2, elapsed_real_time * 2)
+            percentage = min((current_time / estimated_total) * 100, 95)
+            self.progress_callback(current_time, estimated_total, percentage)
+            
+    def finish(self):
+        """转换成功后确保进度显示100%"""
+        if self.total_duration and self.total_duration > 0:
+            self.progress_callback(self.total_duration, self.total_duration, 100.0)
+        else:
+            self.progress_callback(self.last_reported_time, self.last_reported_time, 100.0)
+
+
+@dataclass(frozen=True)
+class Settings:
+    """转换时用到的配置项快照（从config.ini解析一次，之后只读）"""
+    
+    ffmpeg_path: str = 'ffmpeg'
+    sample_rate: str = '44100'
+    audio_bitrate: str = '192k'
+    output_format: str = 'mp3'
+    overwrite: bool = False
+    preserve_dirs: bool = True
+    max_workers: int = _available_cpus()
+    hash_jobs: int = _available_cpus()
+    stream_copy: bool = True
+    dedup_mode: str = 'strict'
+    
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser) -> 'Settings':
+        """从配置文件的DEFAULT节读取配置，缺少的项使用默认值"""
+        return cls(
+            ffmpeg_path=config.get('DEFAULT', 'ffmpeg_path', fallback=cls.ffmpeg_path),
+            sample_rate=config.get('DEFAULT', 'audio_sample_rate', fallback=cls.sample_rate),
+            audio_bitrate=config.get('DEFAULT', 'audio_bitrate', fallback=cls.audio_bitrate),
+            output_format=config.get('DEFAULT', 'output_format', fallback=cls.output_format),
+            overwrite=config.getboolean('DEFAULT', 'overwrite_existing', fallback=cls.overwrite),
+            preserve_dirs=config.getboolean('DEFAULT', 'preserve_directory_structure',
+                                            fallback=cls.preserve_dirs),
+            max_workers=config.getint('DEFAULT', 'max_concurrent_jobs', fallback=cls.max_workers),
+            hash_jobs=config.getint('DEFAULT', 'hash_jobs', fallback=cls.hash_jobs),
+            stream_copy=config.getboolean('DEFAULT', 'stream_copy', fallback=cls.stream_copy),
+            dedup_mode=config.get('DEFAULT', 'dedup_mode', fallback=cls.dedup_mode).strip().lower(),
+        )
+
 
 class VideoAudioConverter:
     """视频转音频转换器 - 核心处理类"""
     
     # 支持的视频格式
-    SUPPORTED_VIDEO_FORMATS = {
+    SUPPORTED_VIDEO_FORMATS = frozenset({
         '.mp4', '.avi', '.mov', '.wmv', '.flv', 
         '.mkv', '.webm', '.mp4v', '.m4v', '.3gp',
         '.mpg', '.mpeg', '.m2v', '.vob', '.asf'
-    }
+    })
+    # 供 str.endswith 一次匹配所有扩展名
+    SUPPORTED_VIDEO_SUFFIXES = tuple(SUPPORTED_VIDEO_FORMATS)
     
     # 支持的音频格式及对应编码器
     SUPPORTED_AUDIO_FORMATS = {
@@ -45,6 +423,36 @@ class VideoAudioConverter:
         'flac': 'flac'
     }
     
+    # 源音频编码与输出格式一致时可以直接复制音频流（输出格式 -> 源音频编码）
+    STREAM_COPY_CODECS = {
+        'mp3': frozenset({'mp3'}),
+        'wav': frozenset({'pcm_s16le'}),
+        'aac': frozenset({'aac'}),
+        'm4a': frozenset({'aac'}),
+        'ogg': frozenset({'vorbis', 'opus'}),
+        'flac': frozenset({'flac'}),
+    }
+    # 常见地携带上述可复制编码的输入容器（输出格式 -> 输入扩展名），其他容器不探测直接重新编码
+    STREAM_COPY_CONTAINERS = {
+        'mp3': frozenset({'.avi', '.mkv', '.flv'}),
+        'wav': frozenset({'.avi', '.mkv', '.mov'}),
+        'aac': frozenset({'.mp4', '.m4v', '.mp4v', '.mov', '.3gp', '.mkv', '.flv'}),
+        'm4a': frozenset({'.mp4', '.m4v', '.mp4v', '.mov', '.3gp', '.mkv', '.flv'}),
+        'ogg': frozenset({'.webm', '.mkv'}),
+        'flac': frozenset({'.mkv'}),
+    }
+    
+    # 转换失败时保留的FFmpeg错误输出行数
+    STDERR_RING_SIZE = 200
+    
+    # 重复检测时先比较的采样窗口大小（文件开头、中间、结尾各一个）
+    PARTIAL_HASH_WINDOW = 64 << 10
+    # 采样覆盖的总字节数，不超过该大小的文件直接读取全部内容
+    PARTIAL_HASH_SIZE = 3 * PARTIAL_HASH_WINDOW
+    
+    # 批量转换时每完成多少个文件刷新一次进度条后缀
+    PROGRESS_POSTFIX_EVERY = 16
+    
     def __init__(self, config_file: str = 'config.ini'):
         """
         初始化转换器
@@ -54,14 +462,21 @@ class VideoAudioConverter:
         """
         self.config_file = config_file
         self.logger = None
+        self._console_handler: Optional[logging.Handler] = None
         self.config = None
+        self.settings = Settings()
         # 重复文件检测相关
-        self.file_hashes: Dict[str, Path] = {}  # 存储文件哈希值和路径的映射
+        self._by_size: Dict[int, List[Path]] = {}  # 文件大小到已登记文件的映射
+        self._partial_hashes: Dict[Path, str] = {}  # 采样部分的哈希值（仅大小相同时计算）
+        self._full_hashes: Dict[Path, str] = {}  # 完整文件哈希值（仅部分哈希相同时计算）
+        self._file_stats: Dict[Path, os.stat_result] = {}  # 已登记文件的状态，作为哈希缓存键，不再重复stat
         self.duplicate_files: Set[Path] = set()  # 存储重复文件路径
         self.processed_files: Set[Path] = set()  # 存储已处理文件路径
         
         # 多线程相关
-        self._lock = threading.Lock()  # 线程锁，用于保护共享资源
+        self._lock = threading.Lock()  # 线程锁，用于保护共享资源（日志模块自身线程安全，写日志不需要加锁）
+        # 本次扫描或批量转换中已创建的输出目录（集合操作在GIL下是原子的，重复mkdir也无害，不需要加锁）
+        self._created_dirs: Set[Path] = set()
         
         self.setup_logging()
         self.load_config()
@@ -75,14 +490,21 @@ class VideoAudioConverter:
         # 配置日志格式
         log_format = '%(asctime)s - %(levelname)s - %(message)s'
         
-        # 设置日志处理器
-        handlers = [
-            logging.FileHandler(
-                log_dir / 'conversion.log', 
-                encoding='utf-8'
-            ),
-            logging.StreamHandler(sys.stdout)
-        ]
+        # 设置日志处理器：日志文件保留完整记录，控制台只显示警告和错误，
+        # 多线程转换时不会每个文件都争抢stdout并打断进度条
+        file_handler = logging.FileHandler(
+            log_dir / 'conversion.log', 
+            encoding='utf-8'
+        )
+        file_handler.setLevel(logging.INFO)
+        self._console_handler = logging.StreamHandler(sys.stdout)
+        self._console_handler.setLevel(logging.WARNING)
+        handlers = [file_handler, self._console_handler]
+        
+        # 日志格式不包含线程和进程信息，不需要为每条记录收集
+        logging.logThreads = False
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
         
         # 配置logging
         logging.basicConfig(
@@ -102,13 +524,27 @@ class VideoAudioConverter:
         if os.path.exists(self.config_file):
             try:
                 self.config.read(self.config_file, encoding='utf-8')
-                self.logger.info(f"已加载配置文件: {self.config_file}")
+                self.logger.info("已加载配置文件: %s", self.config_file)
             except Exception as e:
-                self.logger.warning(f"配置文件读取失败: {e}，将使用默认配置")
+                self.logger.warning("配置文件读取失败: %s，将使用默认配置", e)
                 self.create_default_config()
         else:
             self.create_default_config()
             
+        # 转换每个文件都要用到的配置项只解析一次
+        self.settings = Settings.from_config(self.config)
+        
+    def set_config(self, key: str, value: str):
+        """
+        修改配置项（DEFAULT节）并重新生成配置快照
+        
+        Args:
+            key: 配置项名称
+            value: 配置值（字符串）
+        """
+        self.config.set('DEFAULT', key, value)
+        self.settings = Settings.from_config(self.config)
+        
     def create_default_config(self):
         """创建默认配置文件"""
         self.config['DEFAULT'] = {
@@ -120,145 +556,277 @@ class VideoAudioConverter:
             'ffmpeg_path': 'ffmpeg',
             'overwrite_existing': 'false',
             'preserve_directory_structure': 'true',
-            'max_concurrent_jobs': '1'
+            'max_concurrent_jobs': str(_available_cpus()),
+            'hash_jobs': str(_available_cpus()),
+            'stream_copy': 'true',
+            'dedup_mode': 'strict'
         }
         
         try:
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 self.config.write(f)
-            self.logger.info(f"已创建默认配置文件: {self.config_file}")
+            self.logger.info("已创建默认配置文件: %s", self.config_file)
         except Exception as e:
-            self.logger.warning(f"无法创建配置文件: {e}")
+            self.logger.warning("无法创建配置文件: %s", e)
         
     def check_ffmpeg_availability(self) -> bool:
         """检查FFmpeg是否可用"""
-        ffmpeg_path = self.config.get('DEFAULT', 'ffmpeg_path', fallback='ffmpeg')
+        ffmpeg_path = self.settings.ffmpeg_path
         
-        try:
-            result = subprocess.run(
-                [ffmpeg_path, '-version'],
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='ignore',  # 忽略编码错误
-                timeout=10
-            )
-            
-            if result.returncode == 0:
-                self.logger.info(f"FFmpeg检查通过: {ffmpeg_path}")
-                
-                # 同时检查ffprobe是否可用（用于获取视频时长）
-                ffprobe_path = None
-                if 'ffmpeg' in ffmpeg_path.lower():
-                    ffmpeg_dir = Path(ffmpeg_path).parent
-                    potential_ffprobe = ffmpeg_dir / 'ffprobe.exe'
-                    if potential_ffprobe.exists():
-                        ffprobe_path = str(potential_ffprobe)
-                    else:
-                        ffprobe_path = ffmpeg_path.replace('ffmpeg', 'ffprobe')
-                else:
-                    ffprobe_path = 'ffprobe'
-                
-                try:
-                    probe_result = subprocess.run(
-                        [ffprobe_path, '-version'],
-                        capture_output=True,
-                        text=True,
-                        encoding='utf-8',
-                        errors='ignore',
-                        timeout=5
-                    )
-                    if probe_result.returncode == 0:
-                        self.logger.info(f"FFprobe也可用: {ffprobe_path}")
-                    else:
-                        self.logger.warning("FFprobe不可用，将使用FFmpeg获取视频信息")
-                except:
-                    self.logger.warning("FFprobe不可用，将使用FFmpeg获取视频信息")
-                
-                return True
-            else:
-                self.logger.error("FFmpeg不可用")
-                return False
-                
-        except (subprocess.TimeoutExpired, FileNotFoundError) as e:
-            self.logger.error(f"FFmpeg检查失败: {e}")
+        if _ffmpeg_info(ffmpeg_path) is None:
+            self.logger.error("FFmpeg检查失败: %s", ffmpeg_path)
             self.logger.error("请确保FFmpeg已正确安装并添加到系统PATH中")
             return False
             
-    def calculate_file_hash(self, file_path: Path, chunk_size: int = 8192) -> Optional[str]:
+        self.logger.info("FFmpeg检查通过: %s", ffmpeg_path)
+        
+        # 同时检查ffprobe是否可用（用于获取视频时长）
+        ffprobe_path = _find_ffprobe(ffmpeg_path)
+        if ffprobe_path is not None:
+            self.logger.info("FFprobe也可用: %s", ffprobe_path)
+        else:
+            self.logger.warning("FFprobe不可用，将使用FFmpeg获取视频信息")
+            
+        return True
+            
+    @_stat_cached(HASH_CACHE_FILE, maxsize=65536)
+    def calculate_file_hash(self, file_path: Path, chunk_size: int = 4 << 20) -> Optional[str]:
         """
-        计算文件的MD5哈希值
+        计算文件的哈希值（xxh3_128，未安装xxhash时依次使用blake3、blake2b）
+        
+        结果按文件路径、修改时间和大小缓存，未修改的文件再次扫描时不会重新读取。
         
         Args:
             file_path: 文件路径
-            chunk_size: 读取块大小
+            chunk_size: 读取块大小（默认4MiB，减少大文件的read调用次数并利于内核预读）
             
         Returns:
-            文件MD5哈希值，失败返回None
+            文件哈希值（十六进制），失败返回None
         """
         try:
-            hash_md5 = hashlib.md5()
+            hasher = _new_hasher()
+            buffer = _hash_buffer(chunk_size)
             
-            with open(file_path, 'rb') as f:
+            # 无缓冲模式下 readinto 直接读入复用的缓冲区，不经过中间拷贝
+            with open(file_path, 'rb', buffering=0) as f:
+                if _HAS_FADVISE:
+                    # 提示内核按顺序预读
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                    
                 # 分块读取文件，防止大文件占用过多内存
-                while chunk := f.read(chunk_size):
-                    hash_md5.update(chunk)
+                while n := f.readinto(buffer):
+                    hasher.update(buffer[:n])
                     
-            return hash_md5.hexdigest()
+            return hasher.hexdigest()
             
         except Exception as e:
-            self.logger.warning(f"计算文件哈希失败 {file_path.name}: {e}")
+            self.logger.warning("计算文件哈希失败 %s: %s", file_path.name, e)
             return None
             
-    def is_duplicate_file(self, file_path: Path) -> bool:
+    @_stat_cached(PARTIAL_HASH_CACHE_FILE, maxsize=65536)
+    def _calculate_partial_hash(self, file_path: Path) -> Optional[str]:
+        """
+        计算文件采样部分的哈希值（按路径、修改时间和大小持久缓存）
+        
+        大文件只读取开头、中间和结尾各 PARTIAL_HASH_WINDOW 字节，
+        头部相同但中间或结尾不同的文件（如截断、追加的录像）在这一级即可区分。
+        
+        Returns:
+            部分哈希值，失败返回None
+        """
+        try:
+            hasher = _new_hasher()
+            with open(file_path, 'rb', buffering=0) as f:
+                file_size = os.fstat(f.fileno()).st_size
+                if file_size <= self.PARTIAL_HASH_SIZE:
+                    hasher.update(f.read())
+                else:
+                    window = self.PARTIAL_HASH_WINDOW
+                    for offset in (0, (file_size - window) // 2, file_size - window):
+                        f.seek(offset)
+                        hasher.update(f.read(window))
+            return hasher.hexdigest()
+        except Exception as e:
+            self.logger.warning("计算文件哈希失败 %s: %s", file_path.name, e)
+            return None
+            
+    def _fill_hash_cache(self, cache: Dict[Path, str], paths: List[Path], hash_func,
+                         parallel: bool = False):
+        """
+        计算缓存中缺少的哈希值
+        
+        parallel 为True且多个文件需要计算时用线程池并行读取（hashlib在读取和计算时释放GIL），
+        线程数由配置项 hash_jobs 决定；结果在调用线程中写回缓存，不需要加锁。
+        登记时记录的文件状态作为 st 传给哈希函数，用作缓存键而不再stat。
+        
+        Args:
+            cache: 文件路径到哈希值的缓存
+            paths: 需要哈希值的文件
+            hash_func: 计算单个文件哈希值的函数，失败返回None
+            parallel: 是否使用线程池（只有批量预取时一次要算很多文件才值得创建线程池）
+        """
+        missing = [p for p in paths if p not in cache]
+        hash_jobs = min(self.settings.hash_jobs, len(missing)) if parallel else 1
+        file_stats = self._file_stats
+        
+        def compute(file_path: Path) -> Optional[str]:
+            return hash_func(file_path, st=file_stats.get(file_path))
+        
+        if hash_jobs > 1:
+            with ThreadPoolExecutor(max_workers=hash_jobs) as executor:
+                results = list(executor.map(compute, missing))
+        else:
+            results = [compute(p) for p in missing]
+            
+        for file_path, file_hash in zip(missing, results):
+            if file_hash is not None:
+                cache[file_path] = file_hash
+        
+    def _prefetch_hashes(self, files: List[Path]):
+        """
+        扫描完整个目录后，并行预先计算重复检测会用到的哈希值
+        
+        按 is_duplicate_file 的逐级筛选收集候选：所有大小冲突的文件一起计算采样哈希，
+        采样也相同（且需要完整比较）的文件再一起计算完整哈希，每一级只创建一次线程池。
+        计算的文件集合与逐个检测时相同；之后逐个调用 is_duplicate_file 时直接命中缓存，
+        哪个文件是原文件仍由调用顺序决定。
+        
+        Args:
+            files: 扫描到的视频文件
+        """
+        if self.settings.dedup_mode == 'off':
+            return
+            
+        by_size: Dict[int, List[Path]] = {}
+        for file_path in files:
+            # 扫描时已记录的文件状态直接使用
+            st = self._file_stats.get(file_path)
+            if st is None:
+                try:
+                    st = os.stat(file_path)
+                except OSError:
+                    continue
+            if stat.S_ISREG(st.st_mode):
+                self._file_stats[file_path] = st
+                by_size.setdefault(st.st_size, []).append(file_path)
+                
+        # 第一级：大小相同的文件一起计算采样哈希
+        collisions = [group for group in by_size.values() if len(group) > 1]
+        self._fill_hash_cache(self._partial_hashes, [f for group in collisions for f in group],
+                              self._calculate_partial_hash, parallel=True)
+        if self.settings.dedup_mode == 'fast':
+            return
+            
+        # 第二级：采样哈希也相同的文件一起计算完整哈希（小文件的采样已覆盖全部内容）
+        full_candidates = []
+        for group in collisions:
+            if self._file_stats[group[0]].st_size <= self.PARTIAL_HASH_SIZE:
+                continue
+            by_partial: Dict[str, List[Path]] = {}
+            for file_path in group:
+                partial_hash = self._partial_hashes.get(file_path)
+                if partial_hash is not None:
+                    by_partial.setdefault(partial_hash, []).append(file_path)
+            full_candidates.extend(f for same in by_partial.values() if len(same) > 1 for f in same)
+        self._fill_hash_cache(self._full_hashes, full_candidates, self.calculate_file_hash, parallel=True)
+        
+    def _reset_duplicate_state(self):
+        """清空重复文件检测状态，开始新的扫描"""
+        self._by_size.clear()
+        self._partial_hashes.clear()
+        self._full_hashes.clear()
+        self._file_stats.clear()
+        self.duplicate_files.clear()
+        
+    def is_duplicate_file(self, file_path: Path, st: Optional[os.stat_result] = None) -> bool:
         """
         检查文件是否为重复文件
         
+        逐级筛选：文件大小 -> 开头/中间/结尾采样的哈希 -> 完整文件哈希（dedup_mode = fast 时省略最后一级）。
+        大小唯一的文件不读取内容，只有前一级相同时才计算下一级，
+        已登记文件的哈希在出现同级候选时才补算。
+        dedup_mode = off 时直接返回False，不读取文件状态和内容。
+        
         Args:
             file_path: 要检查的文件路径
+            st: 调用方已经取得的文件状态（已确认是普通文件），None时自行获取
             
         Returns:
             True 如果是重复文件，False 否则
         """
+        # 所有扫描入口都经过这里，检测模式只在这里判断
+        if self.settings.dedup_mode == 'off':
+            return False
+            
         try:
-            # 检查文件是否存在
-            if not file_path.exists() or not file_path.is_file():
+            if st is None:
+                # 一次stat同时判断文件是否存在、是否为普通文件
+                try:
+                    st = os.stat(file_path)
+                except OSError:
+                    return False
+                if not stat.S_ISREG(st.st_mode):
+                    return False
+                    
+            # 记录文件状态，之后计算哈希时直接作为缓存键
+            self._file_stats[file_path] = st
+            
+            # 先检查文件大小，大小不同的文件肯定不重复
+            file_size = st.st_size
+            same_size = self._by_size.setdefault(file_size, [])
+            if not same_size:
+                same_size.append(file_path)
                 return False
                 
-            # 先检查文件大小，大小不同的文件肯定不重复
-            file_size = file_path.stat().st_size
-            
-            # 计算文件哈希值
-            file_hash = self.calculate_file_hash(file_path)
-            
-            if file_hash is None:
+            # 大小相同，比较采样部分的哈希值
+            self._fill_hash_cache(self._partial_hashes, same_size + [file_path],
+                                  self._calculate_partial_hash)
+            partial_hash = self._partial_hashes.get(file_path)
+            if partial_hash is None:
                 # 如果无法计算哈希值，认为不重复（保守做法）
                 return False
                 
-            # 检查哈希值是否已存在
-            if file_hash in self.file_hashes:
-                existing_file = self.file_hashes[file_hash]
+            candidates = [f for f in same_size if self._partial_hashes.get(f) == partial_hash]
+            if not candidates:
+                same_size.append(file_path)
+                return False
                 
-                # 检查原文件是否仍然存在
-                if existing_file.exists():
-                    self.logger.info(f"🔄 检测到重复文件: {file_path.name}")
-                    self.logger.info(f"   原文件: {existing_file}")
-                    self.logger.info(f"   重复文件: {file_path}")
+            if file_size <= self.PARTIAL_HASH_SIZE or self.settings.dedup_mode == 'fast':
+                # 部分哈希已覆盖整个文件内容，或快速模式下大小和采样内容相同即视为重复
+                existing_file = candidates[0]
+            else:
+                # 采样相同，再比较完整文件哈希值
+                self._fill_hash_cache(self._full_hashes, candidates + [file_path],
+                                      self.calculate_file_hash)
+                file_hash = self._full_hashes.get(file_path)
+                if file_hash is None:
+                    return False
                     
-                    # 记录重复文件
-                    self.duplicate_files.add(file_path)
-                    return True
-                else:
-                    # 原文件已不存在，更新映射
-                    self.file_hashes[file_hash] = file_path
+                existing_file = next((f for f in candidates if self._full_hashes.get(f) == file_hash), None)
+                if existing_file is None:
+                    same_size.append(file_path)
                     return False
+                    
+            # 检查原文件是否仍然存在
+            if existing_file.exists():
+                self.logger.info("🔄 检测到重复文件: %s", file_path.name)
+                self.logger.info("   原文件: %s", existing_file)
+                self.logger.info("   重复文件: %s", file_path)
+                
+                # 记录重复文件
+                self.duplicate_files.add(file_path)
+                if file_size > self.PARTIAL_HASH_SIZE and self.settings.dedup_mode != 'fast':
+                    # 重复文件已完整读取过一次且不会再转换，释放它的页缓存；
+                    # 原文件接下来要交给FFmpeg读取，保留在缓存中
+                    _drop_page_cache(file_path)
+                return True
             else:
-                # 新文件，记录哈希值
-                self.file_hashes[file_hash] = file_path
+                # 原文件已不存在，更新映射
+                same_size[same_size.index(existing_file)] = file_path
                 return False
                 
         except Exception as e:
-            self.logger.warning(f"重复文件检查失败 {file_path.name}: {e}")
+            self.logger.warning("重复文件检查失败 %s: %s", file_path.name, e)
             return False
         
     def scan_video_files(self, path: str, recursive: bool = True) -> List[Path]:
@@ -274,75 +842,146 @@ class VideoAudioConverter:
         """
         path_obj = Path(path)
         video_files = []
+        # 两次扫描之间输出目录可能被删除，重新确认
+        self._created_dirs.clear()
         
         if not path_obj.exists():
-            self.logger.error(f"路径不存在: {path_obj}")
+            self.logger.error("路径不存在: %s", path_obj)
             return video_files
         
         # 处理单个文件
-        if path_obj.is_file():
-            if path_obj.suffix.lower() in self.SUPPORTED_VIDEO_FORMATS:
-                self.logger.info(f"🔎 处理单个视频文件: {path_obj}")
+        is_file, suffix, _, _ = _fast_stat(str(path_obj))
+        if is_file:
+            if suffix in self.SUPPORTED_VIDEO_FORMATS:
+                self.logger.info("🔎 处理单个视频文件: %s", path_obj)
                 
                 # 重置重复文件检测状态
-                self.file_hashes.clear()
-                self.duplicate_files.clear()
+                self._reset_duplicate_state()
                 
                 # 检查是否为重复文件（虽然单文件情况下不太可能）
                 if not self.is_duplicate_file(path_obj):
                     video_files.append(path_obj)
-                    self.logger.info(f"📋 文件验证通过: {path_obj.name}")
+                    self.logger.info("📋 文件验证通过: %s", path_obj.name)
                 else:
-                    self.logger.warning(f"⛔ 跳过重复文件: {path_obj.name}")
+                    self.logger.warning("⛔ 跳过重复文件: %s", path_obj.name)
             else:
-                self.logger.error(f"不支持的文件格式: {path_obj.suffix}")
-                self.logger.info(f"支持的格式: {', '.join(self.SUPPORTED_VIDEO_FORMATS)}")
+                self.logger.error("不支持的文件格式: %s", suffix)
+                self.logger.info("支持的格式: %s", ', '.join(self.SUPPORTED_VIDEO_FORMATS))
             
             return video_files
         
         # 处理目录
         if not path_obj.is_dir():
-            self.logger.error(f"路径既不是文件也不是目录: {path_obj}")
+            self.logger.error("路径既不是文件也不是目录: %s", path_obj)
             return video_files
             
-        # 设置扫描模式
-        pattern = '**/*' if recursive else '*'
+        self.logger.info("🔎 开始扫描目录: %s", path_obj)
         
-        self.logger.info(f"🔎 开始扫描目录: {path_obj}")
-        
-        # 重置重复文件检测状态
-        self.file_hashes.clear()
-        self.duplicate_files.clear()
-        
-        duplicate_count = 0
-        total_scanned = 0
+        stats = {'scanned': 0, 'duplicates': 0}
         
         try:
-            for file_path in path_obj.glob(pattern):
-                if (file_path.is_file() and 
-                    file_path.suffix.lower() in self.SUPPORTED_VIDEO_FORMATS):
-                    total_scanned += 1
-                    
-                    # 检查是否为重复文件
-                    if self.is_duplicate_file(file_path):
-                        duplicate_count += 1
-                        self.logger.info(f"⛔ 跳过重复文件: {file_path.name}")
-                    else:
-                        video_files.append(file_path)
+            for file_path in self._iter_unique_video_files(path_obj, recursive, stats, prefetch=True):
+                video_files.append(file_path)
                         
         except Exception as e:
-            self.logger.error(f"扫描目录时出错: {e}")
+            self.logger.error("扫描目录时出错: %s", e)
             
         # 按文件名排序
         video_files = sorted(video_files, key=lambda x: x.name.lower())
         
-        self.logger.info(f"📋 扫描统计:")
-        self.logger.info(f"   总文件数: {total_scanned}")
-        self.logger.info(f"   重复文件: {duplicate_count}")
-        self.logger.info(f"   待处理文件: {len(video_files)}")
+        self.logger.info("📋 扫描统计:")
+        self.logger.info("   总文件数: %s", stats['scanned'])
+        self.logger.info("   重复文件: %s", stats['duplicates'])
+        self.logger.info("   待处理文件: %s", len(video_files))
         
         return video_files
         
+    def _iter_video_files(self, root: str, recursive: bool = True) -> Iterator[os.DirEntry]:
+        """
+        用 os.scandir 流式遍历目录，逐个产出视频文件的目录项
+        
+        先按条目类型区分目录和文件（扩展名像视频的目录同样会被递归），
+        只有扩展名匹配的文件才会产出，不会为其他条目创建Path对象。
+        不跟随目录符号链接，避免循环链接导致无限遍历。
+        
+        Args:
+            root: 要扫描的目录路径
+            recursive: 是否递归扫描子目录
+            
+        Yields:
+            视频文件的 os.DirEntry（文件类型和stat结果由DirEntry缓存）
+        """
+        supported_suffixes = self.SUPPORTED_VIDEO_SUFFIXES
+        stack = [root]
+        
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                stack.append(entry.path)
+                        elif entry.name.lower().endswith(supported_suffixes) and entry.is_file():
+                            yield entry
+            except OSError as e:
+                self.logger.warning("无法读取目录 %s: %s", directory, e)
+                
+    def _scanned_paths(self, directory: Path, recursive: bool) -> Iterator[Path]:
+        """
+        把 _iter_video_files 的目录项转换为路径，并记录目录项缓存的文件状态
+        
+        重复检测开启时，DirEntry.stat() 的结果存入 _file_stats（Windows上直接来自目录列表，
+        不需要额外的系统调用），_prefetch_hashes 和 is_duplicate_file 不再为每个文件重复stat。
+        dedup_mode = off 时不获取文件状态。
+        """
+        need_stat = self.settings.dedup_mode != 'off'
+        for entry in self._iter_video_files(str(directory), recursive):
+            file_path = Path(entry.path)
+            if need_stat:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    st = None
+                if st is not None and stat.S_ISREG(st.st_mode):
+                    self._file_stats[file_path] = st
+            yield file_path
+            
+    def _iter_unique_video_files(self, directory: Path, recursive: bool,
+                                 stats: Dict[str, int], prefetch: bool = False) -> Iterator[Path]:
+        """
+        流式扫描目录中的视频文件并跳过重复文件
+        
+        边扫描边转换时文件逐个产出，大小冲突时只为新文件和同组文件顺序计算哈希；
+        prefetch 为True时先扫描完整个目录，再由 _prefetch_hashes 按组并行计算哈希。
+        
+        Args:
+            directory: 要扫描的目录
+            recursive: 是否递归扫描子目录
+            stats: 扫描统计，实时更新 'scanned' 和 'duplicates' 计数
+            prefetch: 是否先扫描完整个目录并批量计算哈希（调用方不需要流式结果时使用）
+            
+        Yields:
+            非重复的视频文件路径
+        """
+        # 重置重复文件检测状态
+        self._reset_duplicate_state()
+        
+        file_paths = self._scanned_paths(directory, recursive)
+        if prefetch:
+            file_paths = list(file_paths)
+            self._prefetch_hashes(file_paths)
+            
+        for file_path in file_paths:
+            stats['scanned'] += 1
+            
+            # 检查是否为重复文件（复用扫描时记录的文件状态，dedup_mode = off 时不获取）
+            if self.is_duplicate_file(file_path, self._file_stats.get(file_path)):
+                stats['duplicates'] += 1
+                self.logger.info("⛔ 跳过重复文件: %s", file_path.name)
+            else:
+                yield file_path
+        
     def clean_filename(self, filename: str) -> str:
         """
         清理文件名，移除或替换特殊字符
@@ -353,52 +992,13 @@ class VideoAudioConverter:
         Returns:
             清理后的文件名
         """
-        # 定义需要移除或替换的特殊字符
-        # Windows 文件名不允许的字符: < > : " | ? * \ /
-        # 其他可能导致问题的字符
-        
-        # 先移除或替换特殊字符
-        cleaned = filename
-        
-        # 替换常见的特殊字符
-        replacements = {
-            '<': '',
-            '>': '',
-            ':': '-',
-            '"': '',
-            '|': '-',
-            '?': '',
-            '*': '',
-            '\\': '',
-            '/': '-',
-            '【': '[',
-            '】': ']',
-            '（': '(',
-            '）': ')',
-            '？': '',
-            '！': '',
-            '：': '-',
-            '；': '',
-            '，': ',',
-            '。': '.',
-            '、': '',
-            '～': '-',
-            '…': '...',
-            '—': '-',
-            '–': '-',
-            ''': "'",
-            ''': "'",
-            '"': '"',
-            '"': '"',
-        }
-        
-        for old_char, new_char in replacements.items():
-            cleaned = cleaned.replace(old_char, new_char)
+        # 一次遍历完成所有特殊字符的移除和替换
+        cleaned = filename.translate(_FILENAME_TRANS)
         
         # 移除连续的空格和特殊字符
-        cleaned = re.sub(r'\s+', ' ', cleaned)  # 多个空格替换为单个空格
-        cleaned = re.sub(r'[-_]+', '-', cleaned)  # 多个连字符替换为单个
-        cleaned = re.sub(r'\.+', '.', cleaned)  # 多个点替换为单个
+        cleaned = _SPACES_RE.sub(' ', cleaned)  # 多个空格替换为单个空格
+        cleaned = _DASHES_RE.sub('-', cleaned)  # 多个连字符替换为单个
+        cleaned = _DOTS_RE.sub('.', cleaned)  # 多个点替换为单个
         
         # 移除开头和结尾的空格、点、连字符
         cleaned = cleaned.strip(' .-_')
@@ -411,13 +1011,14 @@ class VideoAudioConverter:
         if len(cleaned) > 200:
             cleaned = cleaned[:200]
         
-        self.logger.debug(f"文件名清理: '{filename}' -> '{cleaned}'")
+        self.logger.debug("文件名清理: '%s' -> '%s'", filename, cleaned)
         
         return cleaned
     
+    @_stat_cached(DURATION_CACHE_FILE)
     def _get_video_duration(self, video_path: Path) -> Optional[float]:
         """
-        获取视频文件的时长（秒）
+        获取视频文件的时长（秒），结果按文件路径、修改时间和大小缓存
         
         Args:
             video_path: 视频文件路径
@@ -426,63 +1027,45 @@ class VideoAudioConverter:
             视频时长（秒），失败返回None
         """
         try:
-            ffmpeg_path = self.config.get('DEFAULT', 'ffmpeg_path', fallback='ffmpeg')
-            
-            # 方法1: 尝试使用ffprobe（最准确）
-            ffprobe_candidates = []
-            
-            if 'ffmpeg' in ffmpeg_path.lower():
-                # 如果ffmpeg_path包含完整路径，尝试在同目录找ffprobe
-                ffmpeg_dir = Path(ffmpeg_path).parent
-                ffprobe_candidates.extend([
-                    ffmpeg_dir / 'ffprobe.exe',
-                    ffmpeg_dir / 'ffprobe',
-                    Path(ffmpeg_path.replace('ffmpeg.exe', 'ffprobe.exe')),
-                    Path(ffmpeg_path.replace('ffmpeg', 'ffprobe'))
-                ])
-            
-            # 添加系统PATH中的ffprobe
-            ffprobe_candidates.extend(['ffprobe.exe', 'ffprobe'])
-            
-            # 尝试每个ffprobe候选
-            for ffprobe_path in ffprobe_candidates:
+            ffmpeg_path = self.settings.ffmpeg_path
+            
+            # 方法1: 使用ffprobe只读取容器的 format.duration（最准确，输出就是一个浮点数）
+            ffprobe_path = _find_ffprobe(ffmpeg_path)
+            if ffprobe_path is not None:
                 try:
-                    cmd = [
-                        str(ffprobe_path),
-                        '-v', 'quiet',
-                        '-show_entries', 'format=duration',
-                        '-of', 'csv=p=0',
-                        str(video_path)
-                    ]
-                    
                     result = subprocess.run(
-                        cmd,
+                        [
+                            ffprobe_path,
+                            '-v', 'error',
+                            '-show_entries', 'format=duration',
+                            '-of', 'csv=p=0',
+                            str(video_path)
+                        ],
+                        stdin=subprocess.DEVNULL,
                         capture_output=True,
                         text=True,
                         encoding='utf-8',
                         errors='ignore',
-                        timeout=15
+                        timeout=5
                     )
-                    
-                    if result.returncode == 0 and result.stdout.strip():
-                        duration = float(result.stdout.strip())
-                        if duration > 0:
-                            self.logger.debug(f"通过ffprobe获取时长: {duration}秒")
-                            return duration
-                            
-                except (subprocess.TimeoutExpired, FileNotFoundError, ValueError, OSError):
-                    continue
+                    duration = float(result.stdout.strip())
+                    if result.returncode == 0 and duration > 0:
+                        self.logger.debug("通过ffprobe获取时长: %s秒", duration)
+                        return duration
+                except (subprocess.TimeoutExpired, ValueError, OSError):
+                    pass  # 容器中没有时长信息时回退到ffmpeg
             
             # 方法2: 使用ffmpeg获取时长（从stderr解析）
+            # 不指定输出，FFmpeg读取文件头、打印输入信息后即退出，不解码任何数据
             cmd_fallback = [
                 ffmpeg_path,
-                '-i', str(video_path),
-                '-f', 'null', '-',
-                '-t', '0.1'  # 只处理很短时间，快速获取信息
+                '-hide_banner',
+                '-i', str(video_path)
             ]
             
             result = subprocess.run(
                 cmd_fallback,
+                stdin=subprocess.DEVNULL,
                 capture_output=True,
                 text=True,
                 encoding='utf-8',
@@ -490,30 +1073,84 @@ class VideoAudioConverter:
                 timeout=15
             )
             
-            # 从stderr解析Duration信息
-            if result.stderr:
-                for line in result.stderr.split('\n'):
-                    if 'Duration:' in line:
-                        try:
-                            # 查找Duration: HH:MM:SS.ss格式
-                            duration_part = line.split('Duration: ')[1].split(',')[0].strip()
-                            time_parts = duration_part.split(':')
-                            if len(time_parts) == 3:
-                                hours = float(time_parts[0])
-                                minutes = float(time_parts[1])
-                                seconds = float(time_parts[2])
-                                duration = hours * 3600 + minutes * 60 + seconds
-                                if duration > 0:
-                                    self.logger.debug(f"通过ffmpeg获取时长: {duration}秒")
-                                    return duration
-                        except (ValueError, IndexError):
-                            continue
+            # 从stderr解析Duration: HH:MM:SS.ss
+            for match in _DURATION_RE.finditer(result.stderr or ''):
+                hours, minutes, seconds = match.groups()
+                duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+                if duration > 0:
+                    self.logger.debug("通过ffmpeg获取时长: %s秒", duration)
+                    return duration
                 
         except Exception as e:
-            self.logger.warning(f"获取视频时长失败 {video_path.name}: {e}")
+            self.logger.warning("获取视频时长失败 %s: %s", video_path.name, e)
             
-        self.logger.debug(f"无法获取视频时长: {video_path.name}")
+        self.logger.debug("无法获取视频时长: %s", video_path.name)
         return None
+        
+    @_stat_cached(AUDIO_CODEC_CACHE_FILE, maxsize=65536)
+    def _get_audio_codec(self, video_path: Path) -> Optional[str]:
+        """
+        获取视频文件第一个音频流的编码名称，结果按文件路径、修改时间和大小缓存
+        
+        Args:
+            video_path: 视频文件路径
+            
+        Returns:
+            音频编码名称（如 aac、mp3），没有音频流或失败返回None
+        """
+        try:
+            ffprobe_path = _find_ffprobe(self.settings.ffmpeg_path)
+            if ffprobe_path is not None:
+                result = subprocess.run(
+                    [
+                        ffprobe_path,
+                        '-v', 'error',
+                        '-select_streams', 'a:0',
+                        '-show_entries', 'stream=codec_name',
+                        '-of', 'csv=p=0',
+                        str(video_path)
+                    ],
+                    stdin=subprocess.DEVNULL,
+                    capture_output=True,
+                    text=True,
+                    encoding='utf-8',
+                    errors='ignore',
+                    timeout=5
+                )
+                return result.stdout.strip() or None
+                
+            # 没有ffprobe时从ffmpeg的输入信息中解析（不指定输出，FFmpeg读取文件头后即退出）
+            result = subprocess.run(
+                [self.settings.ffmpeg_path, '-hide_banner', '-i', str(video_path)],
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                text=True,
+                encoding='utf-8',
+                errors='ignore',
+                timeout=5
+            )
+            match = _AUDIO_CODEC_RE.search(result.stderr)
+            return match.group(1) if match else None
+            
+        except Exception as e:
+            self.logger.debug("获取音频编码失败 %s: %s", video_path.name, e)
+            return None
+            
+    def _can_copy_audio(self, input_path: Path, audio_format: str) -> bool:
+        """
+        判断源音频编码是否已是目标格式，可以不重新编码直接复制
+        
+        探测编码要在转换前多启动一个ffprobe/ffmpeg进程，只有输入容器常见地携带
+        可复制的编码时才探测（如 MP4 转 M4A）；其他组合（如 MP4 中的 AAC 转 MP3）
+        几乎总是需要重新编码，直接跳过探测。
+        """
+        audio_format = audio_format.lower()
+        copy_codecs = self.STREAM_COPY_CODECS.get(audio_format)
+        if not self.settings.stream_copy or copy_codecs is None:
+            return False
+        if input_path.suffix.lower() not in self.STREAM_COPY_CONTAINERS.get(audio_format, ()):
+            return False
+        return self._get_audio_codec(input_path) in copy_codecs
     
     def generate_audio_filename(self, 
                               video_path: Path, 
@@ -537,7 +1174,7 @@ class VideoAudioConverter:
             output_path = Path(output_dir)
             
             # 如果需要保持目录结构
-            if self.config.getboolean('DEFAULT', 'preserve_directory_structure', fallback=True):
+            if self.settings.preserve_dirs:
                 # 计算相对路径
                 try:
                     # 获取视频文件相对于其根目录的路径
@@ -551,7 +1188,7 @@ class VideoAudioConverter:
                     pass
             
             # 创建输出目录
-            output_path.mkdir(parents=True, exist_ok=True)
+            self._ensure_dir(output_path)
             audio_filename = output_path / f"{clean_stem}.{output_format}"
         else:
             # 输出到原文件同目录
@@ -559,12 +1196,194 @@ class VideoAudioConverter:
             
         return audio_filename
         
+    def _build_ffmpeg_command(self,
+                              input_path: Path,
+                              outputs: List[Tuple[Path, str, str]],
+                              with_progress: bool = False,
+                              max_duration: Optional[float] = None,
+                              with_info: bool = False,
+                              ffmpeg_threads: Optional[int] = None) -> List[str]:
+        """
+        构建FFmpeg转换命令
+        
+        多个输出共用一次输入解复用和解码，每个输出有各自的编码参数。
+        
+        Args:
+            input_path: 输入视频文件路径
+            outputs: (输出音频文件路径, 音频格式, 音频比特率) 列表
+            with_progress: 是否输出 -progress 进度记录到stdout
+            max_duration: 最多转换的时长（秒），None表示转换完整文件
+            with_info: stderr是否同时输出带级别标签的输入文件信息（用于读取总时长）
+            ffmpeg_threads: FFmpeg进程的线程数，None表示由FFmpeg自动决定
+            
+        Returns:
+            FFmpeg命令参数列表
+        """
+        # stderr只保留错误信息，用于失败时诊断，不输出统计信息刷屏；
+        # 需要总时长时改为带级别标签的info输出，读取时再过滤
+        loglevel = 'level+info' if with_info else 'error'
+        # -nostdin: 不读取终端输入，批量运行时不会吞掉用户的按键或等待交互
+        cmd = [self.settings.ffmpeg_path, '-nostdin', '-hide_banner', '-nostats', '-loglevel', loglevel]
+        if with_progress:
+            # 使用 -progress 输出结构化的 key=value 进度记录到stdout
+            cmd += ['-progress', 'pipe:1']
+        cmd.append('-y' if self.settings.overwrite else '-n')
+        if ffmpeg_threads is not None:
+            # -ar 重采样会建立滤镜图，滤镜线程数默认等于CPU核心数，并行时同样需要限制
+            cmd += ['-filter_threads', str(ffmpeg_threads)]
+        if max_duration is not None:
+            # 放在 -i 之前作为输入选项，读到指定时长就停止解复用
+            cmd += ['-t', str(max_duration)]
+            
+        cmd += ['-i', str(input_path)]  # 输入文件
+        for output_path, audio_format, bitrate in outputs:
+            cmd += self._output_args(input_path, output_path, audio_format, bitrate, ffmpeg_threads)
+        return cmd
+        
+    def _output_args(self, input_path: Path, output_path: Path,
+                     audio_format: str, bitrate: str,
+                     ffmpeg_threads: Optional[int] = None) -> List[str]:
+        """构建单个输出文件的FFmpeg参数（输出选项必须放在对应的输出文件之前）"""
+        # 获取音频编码器
+        codec = self.SUPPORTED_AUDIO_FORMATS.get(audio_format.lower(), 'libmp3lame')
+        
+        args = ['-vn']  # 不包含视频流
+        if self._can_copy_audio(input_path, audio_format):
+            # 源音频编码已符合目标格式，直接复制音频流（无损且不需要解码和编码）
+            self.logger.info("🔁 音频编码一致，直接复制音频流: %s", input_path.name)
+            args += ['-acodec', 'copy']
+        else:
+            args += [
+                '-acodec', codec,       # 音频编码器
+                '-ab', bitrate,         # 音频比特率
+                '-ar', self.settings.sample_rate,  # 采样率
+            ]
+        if ffmpeg_threads is not None:
+            # 多个FFmpeg并行时限制各自的线程数，避免线程总数超过CPU核心数
+            args += ['-threads', str(ffmpeg_threads)]
+        args.append(str(output_path))  # 输出文件
+        return args
+        
+    def _prepare_output(self, output_path: Path) -> bool:
+        """
+        转换前检查输出文件
+        
+        Returns:
+            True 表示需要转换，False 表示已存在且不覆盖
+        """
+        # 检查输出文件是否已存在
+        if output_path.exists() and not self.settings.overwrite:
+            self.logger.info("跳过已存在的文件: %s", output_path.name)
+            return False
+            
+        # 确保输出目录存在
+        self._ensure_dir(output_path.parent)
+        return True
+        
+    def _ensure_dir(self, directory: Path):
+        """创建目录，同一目录下的大量文件只调用一次mkdir"""
+        if directory not in self._created_dirs:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(directory)
+        
+    def _verify_output(self, input_path: Path, output_path: Path) -> bool:
+        """验证输出文件是否创建成功"""
+        try:
+            # 一次stat同时判断是否存在和是否为空
+            output_size = os.stat(output_path).st_size
+        except OSError:
+            output_size = 0
+        if output_size > 0:
+            self.logger.info("✓ 转换成功: %s -> %s", input_path.name, output_path.name)
+            return True
+        else:
+            self.logger.error("✗ 转换失败: 输出文件未创建或为空")
+            return False
+            
+    def _check_return_code(self, input_path: Path, return_code: int, stderr_tail: deque) -> bool:
+        """根据FFmpeg退出码和错误输出记录日志"""
+        if return_code != 0:
+            self.logger.error("✗ FFmpeg转换失败 %s: %s", input_path.name, '\n'.join(stderr_tail))
+            return False
+        if stderr_tail:
+            self.logger.warning("FFmpeg警告: %s", '\n'.join(stderr_tail))
+        return True
+        
+    @staticmethod
+    def _limit_duration(total_duration: Optional[float],
+                        max_duration: Optional[float]) -> Optional[float]:
+        """限制转换时长时，进度按实际转换的时长计算"""
+        if total_duration and max_duration is not None:
+            return min(total_duration, max_duration)
+        return total_duration
+        
+    @staticmethod
+    def _iter_records(stream, chunk_size: int = 4096) -> Iterator[bytes]:
+        """
+        直接用 os.read 从管道文件描述符按块读取，按回车或换行切分出完整记录
+        
+        避免文件对象逐行读取的缓冲开销；不完整的尾部留到下一块拼接。
+        
+        Args:
+            stream: 子进程的stdout/stderr管道
+            chunk_size: 每次读取的最大字节数
+            
+        Yields:
+            去掉行结束符的非空记录
+        """
+        fd = stream.fileno()
+        buf = b''
+        while True:
+            chunk = os.read(fd, chunk_size)
+            if not chunk:
+                break
+            buf += chunk
+            # FFmpeg进度用 \r 刷新同一行，统一成 \n 再切分
+            records = buf.replace(b'\r', b'\n').split(b'\n')
+            buf = records.pop()
+            for record in records:
+                if record:
+                    yield record
+        if buf:
+            yield buf
+            
+    @staticmethod
+    def _collect_stderr(line: bytes, stderr_tail: deque,
+                        tracker: Optional[_ProgressTracker] = None,
+                        max_duration: Optional[float] = None):
+        """
+        处理一行FFmpeg的stderr输出
+        
+        带级别标签时只保留错误级别的行；总时长未知时从输入文件信息的 Duration 行读取，
+        不需要在转换前单独启动进程探测时长。
+        """
+        match = _LOG_LEVEL_RE.match(line)
+        if match is None or match.group(1) in _ERROR_LOG_LEVELS:
+            stderr_tail.append(line.decode('utf-8', errors='ignore').rstrip())
+        elif tracker is not None and tracker.total_duration is None and b'Duration:' in line:
+            duration = _DURATION_RE.search(line.decode('utf-8', errors='ignore'))
+            if duration:
+                hours, minutes, seconds = duration.groups()
+                tracker.total_duration = VideoAudioConverter._limit_duration(
+                    int(hours) * 3600 + int(minutes) * 60 + float(seconds), max_duration
+                )
+                
+    @staticmethod
+    def _drain_stderr(stream, stderr_tail: deque,
+                      tracker: Optional[_ProgressTracker] = None,
+                      max_duration: Optional[float] = None):
+        """读取FFmpeg的stderr直到结束，只保留最后若干行错误输出"""
+        for line in VideoAudioConverter._iter_records(stream):
+            VideoAudioConverter._collect_stderr(line, stderr_tail, tracker, max_duration)
+            
     def convert_single_file(self, 
                           input_path: Path, 
                           output_path: Path,
                           audio_format: str = 'mp3', 
                           bitrate: str = '192k',
-                          progress_callback=None) -> bool:
+                          progress_callback=None,
+                          max_duration: Optional[float] = None,
+                          ffmpeg_threads: Optional[int] = None) -> bool:
         """
         转换单个视频文件为音频
         
@@ -574,205 +1393,315 @@ class VideoAudioConverter:
             audio_format: 音频格式
             bitrate: 音频比特率
             progress_callback: 进度回调函数，接收 (current_time, total_time, percentage) 参数
+            max_duration: 最多转换的时长（秒），None表示转换完整文件
+            ffmpeg_threads: FFmpeg进程的线程数，None表示由FFmpeg自动决定（多个文件并行转换时用于分配CPU）
             
         Returns:
             转换是否成功
         """
+        return self.convert_single_file_multi(input_path, [(output_path, audio_format, bitrate)],
+                                              progress_callback, max_duration, ffmpeg_threads)
+        
+    def convert_single_file_multi(self,
+                                  input_path: Path,
+                                  outputs: List[Tuple[Path, str, str]],
+                                  progress_callback=None,
+                                  max_duration: Optional[float] = None,
+                                  ffmpeg_threads: Optional[int] = None) -> bool:
+        """
+        用一次FFmpeg调用把视频转换为多个音频文件，输入只解复用和解码一次
+        
+        Args:
+            input_path: 输入视频文件路径
+            outputs: (输出音频文件路径, 音频格式, 音频比特率) 列表
+            progress_callback: 进度回调函数，接收 (current_time, total_time, percentage) 参数
+            max_duration: 最多转换的时长（秒），None表示转换完整文件
+            ffmpeg_threads: FFmpeg进程的线程数，None表示由FFmpeg自动决定
+            
+        Returns:
+            所有输出是否都转换成功
+        """
         try:
-            # 检查输出文件是否已存在
-            if (output_path.exists() and 
-                not self.config.getboolean('DEFAULT', 'overwrite_existing', fallback=False)):
-                self.logger.info(f"跳过已存在的文件: {output_path.name}")
+            outputs = [output for output in outputs if self._prepare_output(output[0])]
+            if not outputs:
                 return True
                 
-            # 确保输出目录存在
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-                
-            # 获取音频编码器
-            codec = self.SUPPORTED_AUDIO_FORMATS.get(audio_format.lower(), 'libmp3lame')
-            ffmpeg_path = self.config.get('DEFAULT', 'ffmpeg_path', fallback='ffmpeg')
-            sample_rate = self.config.get('DEFAULT', 'audio_sample_rate', fallback='44100')
-            
-            # 构建FFmpeg命令
-            cmd = [
-                ffmpeg_path,
-                '-i', str(input_path),  # 输入文件
-                '-vn',                  # 不包含视频流
-                '-acodec', codec,       # 音频编码器
-                '-ab', bitrate,         # 音频比特率
-                '-ar', sample_rate,     # 采样率
-                '-y' if self.config.getboolean('DEFAULT', 'overwrite_existing', fallback=False) else '-n',
-                str(output_path)        # 输出文件
-            ]
-            
             # 如果有进度回调，使用实时输出模式
             if progress_callback:
-                # 获取视频总时长
-                total_duration = self._get_video_duration(input_path)
-                self.logger.debug(f"视频时长: {total_duration}秒")
+                # 总时长从FFmpeg输出的输入文件信息中读取
+                cmd = self._build_ffmpeg_command(input_path, outputs, with_progress=True,
+                                                 max_duration=max_duration, with_info=True,
+                                                 ffmpeg_threads=ffmpeg_threads)
+                tracker = _ProgressTracker(progress_callback, None)
                 
-                # 使用stderr输出监控进度（更可靠的方法）
                 process = subprocess.Popen(
                     cmd,
+                    stdin=subprocess.DEVNULL,
                     stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    encoding='utf-8',
-                    errors='ignore'
+                    stderr=subprocess.PIPE
                 )
                 
-                import time
-                progress_start_time = time.time()
-                last_reported_time = 0
+                # 后台线程持续读取stderr，避免管道写满导致FFmpeg阻塞
+                stderr_tail = deque(maxlen=self.STDERR_RING_SIZE)
+                stderr_thread = threading.Thread(
+                    target=self._drain_stderr,
+                    args=(process.stderr, stderr_tail, tracker, max_duration),
+                    daemon=True
+                )
+                stderr_thread.start()
                 
-                # 实时读取stderr输出
-                while True:
-                    output = process.stderr.readline()
-                    if output == '' and process.poll() is not None:
-                        break
-                    
-                    if output:
-                        # 查找时间信息 (格式: time=00:01:23.45)
-                        if 'time=' in output:
-                            try:
-                                time_match = output.split('time=')[1].split()[0]
-                                # 解析时间格式 HH:MM:SS.ss
-                                time_parts = time_match.split(':')
-                                if len(time_parts) >= 3:
-                                    hours = float(time_parts[0])
-                                    minutes = float(time_parts[1])
-                                    seconds = float(time_parts[2])
-                                    current_time = hours * 3600 + minutes * 60 + seconds
-                                    
-                                    # 避免重复报告相同的时间
-                                    if current_time > last_reported_time:
-                                        last_reported_time = current_time
-                                        
-                                        if total_duration and total_duration > 0:
-                                            # 有总时长，显示准确进度
-                                            percentage = min((current_time / total_duration) * 100, 100)
-                                            progress_callback(current_time, total_duration, percentage)
-                                        else:
-                                            # 没有总时长，基于处理时间估算
-                                            elapsed_real_time = time.time() - progress_start_time
-                                            # 假设转换速度约为1:1到2:1
-                                            estimated_total = max(current_time * 1.2, elapsed_real_time * 2)
-                                            percentage = min((current_time / estimated_total) * 100, 95)
-                                            progress_callback(current_time, estimated_total, percentage)
-                                            
-                            except (ValueError, IndexError) as e:
-                                self.logger.debug(f"解析时间失败: {e}")
-                                pass
-                        
-                        # 检查是否有错误信息
-                        if 'error' in output.lower() or 'failed' in output.lower():
-                            self.logger.warning(f"FFmpeg警告: {output.strip()}")
+                # 按块读取进度记录 (格式: out_time_us=83450000)
+                for line in self._iter_records(process.stdout):
+                    tracker.feed(line)
                 
                 # 等待进程完成
                 return_code = process.wait()
+                stderr_thread.join()
                 
-                if return_code != 0:
-                    # 读取剩余的stderr输出
-                    remaining_stderr = process.stderr.read()
-                    self.logger.error(f"✗ FFmpeg转换失败 {input_path.name}: {remaining_stderr}")
+                if not self._check_return_code(input_path, return_code, stderr_tail):
                     return False
-                else:
-                    # 确保进度显示100%
-                    if progress_callback:
-                        if total_duration and total_duration > 0:
-                            progress_callback(total_duration, total_duration, 100.0)
-                        else:
-                            progress_callback(last_reported_time, last_reported_time, 100.0)
+                    
+                # 确保进度显示100%
+                tracker.finish()
                     
             else:
                 # 原有的非进度模式
-                result = subprocess.run(
+                cmd = self._build_ffmpeg_command(input_path, outputs, max_duration=max_duration,
+                                                 ffmpeg_threads=ffmpeg_threads)
+                # 只有stderr接管道（仅错误信息，失败时才解码）
+                subprocess.run(
                     cmd,
-                    capture_output=True,
-                    text=True,
-                    encoding='utf-8',
-                    errors='ignore',  # 忽略编码错误
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
                     timeout=300,  # 5分钟超时
                     check=True
                 )
             
-            # 验证输出文件是否创建成功
-            if output_path.exists() and output_path.stat().st_size > 0:
-                self.logger.info(f"✓ 转换成功: {input_path.name} -> {output_path.name}")
-                return True
-            else:
-                self.logger.error(f"✗ 转换失败: 输出文件未创建或为空")
-                return False
+            # 逐个检查，每个输出文件都记录结果
+            results = [self._verify_output(input_path, output[0]) for output in outputs]
+            return all(results)
             
         except subprocess.CalledProcessError as e:
-            self.logger.error(f"✗ FFmpeg转换失败 {input_path.name}: {e.stderr if e.stderr else str(e)}")
+            stderr = e.stderr.decode('utf-8', errors='ignore').strip() if e.stderr else ''
+            self.logger.error("✗ FFmpeg转换失败 %s: %s", input_path.name, stderr or str(e))
             return False
         except subprocess.TimeoutExpired:
-            self.logger.error(f"✗ 转换超时 {input_path.name}: 操作超过5分钟")
+            self.logger.error("✗ 转换超时 %s: 操作超过5分钟", input_path.name)
             return False
         except Exception as e:
-            self.logger.error(f"✗ 转换出错 {input_path.name}: {str(e)}")
+            self.logger.error("✗ 转换出错 %s: %s", input_path.name, e)
+            return False
+            
+    async def convert_single_file_async(self, 
+                                        input_path: Path, 
+                                        output_path: Path,
+                                        audio_format: str = 'mp3', 
+                                        bitrate: str = '192k',
+                                        progress_callback=None,
+                                        max_duration: Optional[float] = None,
+                                        ffmpeg_threads: Optional[int] = None) -> bool:
+        """
+        转换单个视频文件为音频（asyncio版本）
+        
+        进度读取和stderr收集在同一个事件循环中并发进行，不需要为每个管道单独开线程。
+        参数和返回值与 convert_single_file 相同。
+        """
+        try:
+            if not self._prepare_output(output_path):
+                return True
+                
+            # 始终读取 -progress 记录；有进度回调时总时长从stderr的输入文件信息中读取
+            # 构建命令时可能需要探测音频编码，是阻塞调用，放到线程中执行
+            # （asyncio.to_thread 需要 Python 3.9，这里用默认线程池以支持 3.8）
+            cmd = await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+                self._build_ffmpeg_command, input_path,
+                [(output_path, audio_format, bitrate)], with_progress=True,
+                max_duration=max_duration,
+                with_info=progress_callback is not None,
+                ffmpeg_threads=ffmpeg_threads))
+            tracker = _ProgressTracker(progress_callback, None) if progress_callback else None
+            
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            
+            stderr_tail = deque(maxlen=self.STDERR_RING_SIZE)
+            
+            async def _drain_stderr():
+                async for line in process.stderr:
+                    self._collect_stderr(line, stderr_tail, tracker, max_duration)
+                    
+            async def _read_progress():
+                async for line in process.stdout:
+                    if tracker:
+                        tracker.feed(line)
+                        
+            stderr_task = asyncio.create_task(_drain_stderr())
+            try:
+                # 读取进度、收集stderr和等待进程退出共用一个5分钟的期限，与同步版本一致
+                _, return_code, _ = await asyncio.wait_for(
+                    asyncio.gather(_read_progress(), process.wait(), stderr_task), timeout=300
+                )
+            except asyncio.TimeoutError:
+                self.logger.error("✗ 转换超时 %s: 操作超过5分钟", input_path.name)
+                return False
+            finally:
+                # 超时、出错或被取消时结束FFmpeg进程，并等待stderr任务结束，不留下未完成的任务
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                if not stderr_task.done():
+                    stderr_task.cancel()
+                    try:
+                        await stderr_task
+                    except asyncio.CancelledError:
+                        pass
+                
+            if not self._check_return_code(input_path, return_code, stderr_tail):
+                return False
+                
+            if tracker:
+                # 确保进度显示100%
+                tracker.finish()
+                
+            return self._verify_output(input_path, output_path)
+            
+        except Exception as e:
+            self.logger.error("✗ 转换出错 %s: %s", input_path.name, e)
             return False
             
     def _convert_single_task(self, video_file: Path, output_directory: Optional[str], 
-                           audio_format: str, bitrate: str, progress_callback=None, 
-                           file_progress_callback=None) -> Tuple[bool, Path, Path]:
+                           audio_format: Union[str, Sequence[str]], bitrate: str, progress_callback=None, 
+                           file_progress_callback=None,
+                           max_duration: Optional[float] = None,
+                           ffmpeg_threads: Optional[int] = None) -> Tuple[bool, Path, Path]:
         """
         单个文件转换任务（用于多线程）
         
         Args:
+            audio_format: 音频格式，多个格式时用一次FFmpeg调用同时输出
             progress_callback: 进度回调函数（用于单文件转换）
-            file_progress_callback: 文件级进度回调函数，接收 (filename, current_time, total_time, percentage) 参数
+            file_progress_callback: 文件级进度回调函数，接收 (file_path, current_time, total_time, percentage) 参数，
+                file_path 为视频文件的完整路径（递归扫描时不同子目录中可能有同名文件）
+            max_duration: 每个文件最多转换的时长（秒），None表示转换完整文件
+            ffmpeg_threads: 每个FFmpeg进程的线程数（由 _threads_per_ffmpeg 按并发数计算），None表示不限制
             
         Returns:
-            (是否成功, 输入文件路径, 输出文件路径)
+            (是否成功, 输入文件路径, 输出文件路径)（多个格式时为第一个输出文件）
         """
         try:
             # 生成输出文件路径
-            audio_file = self.generate_audio_filename(
-                video_file, output_directory, audio_format
-            )
+            formats = [audio_format] if isinstance(audio_format, str) else list(audio_format)
+            outputs = [
+                (self.generate_audio_filename(video_file, output_directory, fmt), fmt, bitrate)
+                for fmt in formats
+            ]
+            audio_file = outputs[0][0]
             
             # 如果文件名被清理了，显示信息
             if video_file.stem != audio_file.stem:
-                with self._lock:
-                    self.logger.info(f"🔧 文件名已清理: {video_file.name} -> {audio_file.name}")
+                self.logger.info("🔧 文件名已清理: %s -> %s", video_file.name, audio_file.name)
             
             # 创建文件级进度回调包装器
             def wrapped_progress_callback(current_time, total_time, percentage):
                 if progress_callback:
                     progress_callback(current_time, total_time, percentage)
                 if file_progress_callback:
-                    file_progress_callback(video_file.name, current_time, total_time, percentage)
+                    file_progress_callback(str(video_file), current_time, total_time, percentage)
             
             # 转换文件
-            success = self.convert_single_file(video_file, audio_file, audio_format, bitrate, wrapped_progress_callback)
+            success = self.convert_single_file_multi(video_file, outputs, wrapped_progress_callback,
+                                                     max_duration=max_duration,
+                                                     ffmpeg_threads=ffmpeg_threads)
             return success, video_file, audio_file
             
         except Exception as e:
-            with self._lock:
-                self.logger.error(f"任务执行出错 {video_file.name}: {e}")
+            self.logger.error("任务执行出错 %s: %s", video_file.name, e)
             return False, video_file, Path("")
 
+    @staticmethod
+    def _progress_bar(iterable=None, **kwargs) -> tqdm:
+        """
+        创建批量转换进度条
+        
+        stderr 不是终端（重定向到日志、CI环境）时禁用进度条，避免控制字符刷屏；
+        刷新间隔限制在0.5秒，大量小文件时不会每完成一个就重绘一次。
+        """
+        return tqdm(
+            iterable,
+            desc="转换进度", 
+            unit="文件",
+            ncols=100,
+            bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]',
+            disable=not sys.stderr.isatty(),
+            mininterval=0.5,
+            **kwargs
+        )
+        
+    def _postfix_due(self, pbar: tqdm, done: int, total: Optional[int]) -> bool:
+        """每完成 PROGRESS_POSTFIX_EVERY 个文件或全部完成时才刷新进度条后缀"""
+        if pbar.disable:
+            return False
+        return done % self.PROGRESS_POSTFIX_EVERY == 0 or done == total
+        
+    @staticmethod
+    def _threads_per_ffmpeg(max_workers: int) -> Optional[int]:
+        """并发任务数 × 每个FFmpeg的线程数 ≈ CPU核心数；只有一个任务时由FFmpeg自行决定"""
+        if max_workers <= 1:
+            return None
+        return max(1, _available_cpus() // max_workers)
+        
+    def _largest_first(self, video_files: List[Path]) -> List[Path]:
+        """
+        按文件大小从大到小排序（最长任务优先），多线程转换时不会在最后只剩一个大文件占用一个线程
+        
+        大小优先使用扫描时记录的文件状态，没有记录（如 dedup_mode = off）时才stat。
+        """
+        def size(file_path: Path) -> int:
+            st = self._file_stats.get(file_path)
+            if st is None:
+                try:
+                    st = os.stat(file_path)
+                except OSError:
+                    return 0
+            return st.st_size
+            
+        return sorted(video_files, key=size, reverse=True)
+        
+    @staticmethod
+    def _update_postfix(pbar: tqdm, postfix: Dict[str, object], success: int, done: int, **values):
+        """原地更新进度条后缀的统计值，不单独重绘（下次进度刷新或关闭进度条时一并显示）"""
+        postfix['✅'] = success
+        postfix['❌'] = done - success
+        postfix.update(values)
+        pbar.set_postfix(postfix, refresh=False)
+        
     def batch_convert(self, 
                      input_path: str, 
                      output_directory: Optional[str] = None,
-                     audio_format: str = 'mp3',
+                     audio_format: Union[str, Sequence[str]] = 'mp3',
                      bitrate: str = '192k',
                      recursive: bool = True,
                      max_workers: Optional[int] = None,
-                     file_progress_callback=None) -> Tuple[int, int, int]:
+                     file_progress_callback=None,
+                     max_duration: Optional[float] = None) -> Tuple[int, int, int]:
         """
         批量转换视频文件或单个视频文件
         
         Args:
             input_path: 输入目录或单个视频文件路径
             output_directory: 输出目录
-            audio_format: 音频格式
+            audio_format: 音频格式，可以是多个格式的列表（每个视频只解码一次，同时输出各个格式）
             bitrate: 音频比特率
             recursive: 是否递归扫描（仅对目录有效）
             max_workers: 最大线程数，None表示使用配置文件中的设置
-            file_progress_callback: 文件级进度回调函数，接收 (filename, current_time, total_time, percentage) 参数
+            file_progress_callback: 文件级进度回调函数，接收 (file_path, current_time, total_time, percentage) 参数，
+                file_path 为视频文件的完整路径（递归扫描时不同子目录中可能有同名文件）
+            max_duration: 每个文件最多转换的时长（秒），None表示转换完整文件
             
         Returns:
             (成功数量, 总数量, 重复数量)
@@ -783,6 +1712,20 @@ class VideoAudioConverter:
             self.logger.error("FFmpeg不可用，请检查安装和配置")
             return 0, 0, 0
         
+        # 两次转换之间输出目录可能被删除，重新确认
+        self._created_dirs.clear()
+        
+        # 确定线程数
+        if max_workers is None:
+            max_workers = self.settings.max_workers
+            
+        # 多线程处理目录时边扫描边转换
+        if max_workers > 1 and Path(input_path).is_dir():
+            return self._batch_convert_streaming(
+                Path(input_path), output_directory, audio_format, bitrate,
+                recursive, max_workers, file_progress_callback, max_duration
+            )
+        
         # 扫描视频文件（包括重复文件检测）
         video_files = self.scan_video_files(input_path, recursive)
         duplicate_count = len(self.duplicate_files)
@@ -794,11 +1737,11 @@ class VideoAudioConverter:
         success_count = 0
         total_count = len(video_files)
         
-        # 确定线程数
-        if max_workers is None:
-            max_workers = self.config.getint('DEFAULT', 'max_concurrent_jobs', fallback=1)
+        # 文件数少于线程数时减少线程，每个FFmpeg可以多用几个线程
+        max_workers = min(max_workers, total_count)
+        ffmpeg_threads = self._threads_per_ffmpeg(max_workers)
         
-        self.logger.info(f"🎥 开始批量转换 {total_count} 个文件")
+        self.logger.info("🎥 开始批量转换 %s 个文件", total_count)
         if duplicate_count > 0:
             print(f"\n🔄 检测到 {duplicate_count} 个重复文件，已跳过")
         print(f"\n🎥 开始处理 {total_count} 个视频文件...")
@@ -806,53 +1749,43 @@ class VideoAudioConverter:
         
         if max_workers == 1:
             # 单线程处理
-            with tqdm(
-                video_files, 
-                desc="转换进度", 
-                unit="文件",
-                ncols=100,
-                bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]'
-            ) as pbar:
+            postfix = {'✅': 0, '❌': 0, '🔄': duplicate_count, '当前': ''}
+            with self._progress_bar(video_files, total=total_count) as pbar:
                 
-                for video_file in pbar:
-                    # 更新进度条描述
-                    pbar.set_description(f"📹 {video_file.name[:30]}...")
-                    
+                for done, video_file in enumerate(pbar, 1):
                     success, _, audio_file = self._convert_single_task(
                         video_file, output_directory, audio_format, bitrate, 
-                        file_progress_callback=file_progress_callback
+                        file_progress_callback=file_progress_callback,
+                        max_duration=max_duration,
+                        ffmpeg_threads=ffmpeg_threads
                     )
                     
                     if success:
                         success_count += 1
                         
                     # 更新进度条后缀信息
-                    pbar.set_postfix({
-                        '✅': success_count,
-                        '❌': total_count - success_count,
-                        '🔄': duplicate_count,
-                        '当前': audio_file.name[:15] + "..." if audio_file.name and len(audio_file.name) > 15 else str(audio_file.name)
-                    })
+                    if self._postfix_due(pbar, done, total_count):
+                        name = audio_file.name
+                        self._update_postfix(pbar, postfix, success_count, done,
+                                             当前=name[:15] + "..." if len(name) > 15 else name)
         else:
-            # 多线程处理
+            # 多线程处理，大文件先提交
+            video_files = self._largest_first(video_files)
             with ThreadPoolExecutor(max_workers=max_workers) as executor:
                 # 提交所有任务
                 future_to_file = {
                     executor.submit(self._convert_single_task, video_file, output_directory, audio_format, bitrate, 
-                                  file_progress_callback=file_progress_callback): video_file
+                                  file_progress_callback=file_progress_callback,
+                                  max_duration=max_duration,
+                                  ffmpeg_threads=ffmpeg_threads): video_file
                     for video_file in video_files
                 }
                 
                 # 使用tqdm显示进度
-                with tqdm(
-                    total=total_count,
-                    desc="转换进度", 
-                    unit="文件",
-                    ncols=100,
-                    bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]'
-                ) as pbar:
+                postfix = {'✅': 0, '❌': 0, '🔄': duplicate_count, '线程': max_workers}
+                with self._progress_bar(total=total_count) as pbar:
                     
-                    for future in as_completed(future_to_file):
+                    for done, future in enumerate(as_completed(future_to_file), 1):
                         video_file = future_to_file[future]
                         
                         try:
@@ -863,19 +1796,103 @@ class VideoAudioConverter:
                             
                             # 更新进度条
                             pbar.update(1)
-                            pbar.set_description(f"📹 {video_file.name[:30]}...")
-                            pbar.set_postfix({
-                                '✅': success_count,
-                                '❌': pbar.n - success_count,
-                                '🔄': duplicate_count,
-                                '线程': max_workers
-                            })
+                            if self._postfix_due(pbar, done, total_count):
+                                self._update_postfix(pbar, postfix, success_count, done)
                             
                         except Exception as e:
-                            self.logger.error(f"任务执行异常 {video_file.name}: {e}")
+                            self.logger.error("任务执行异常 %s: %s", video_file.name, e)
                             pbar.update(1)
                 
         return success_count, total_count, duplicate_count
+        
+    def _batch_convert_streaming(self,
+                                 directory: Path,
+                                 output_directory: Optional[str],
+                                 audio_format: Union[str, Sequence[str]],
+                                 bitrate: str,
+                                 recursive: bool,
+                                 max_workers: int,
+                                 file_progress_callback=None,
+                                 max_duration: Optional[float] = None) -> Tuple[int, int, int]:
+        """
+        多线程批量转换目录：边扫描边提交任务
+        
+        扫描和重复检测在当前线程进行，找到第一个文件后转换即开始；
+        同时排队或执行的任务最多 max_workers*2 个，扫描不会远远领先于转换。
+        
+        Returns:
+            (成功数量, 总数量, 重复数量)
+        """
+        self.logger.info("🔎 开始扫描目录: %s", directory)
+        print("\n🎥 开始处理视频文件（边扫描边转换）...")
+        print(f"🧵 使用线程数: {max_workers}")
+        
+        stats = {'scanned': 0, 'duplicates': 0}
+        counts = {'success': 0, 'total': 0, 'done': 0}
+        ffmpeg_threads = self._threads_per_ffmpeg(max_workers)
+        pending = threading.Semaphore(max_workers * 2)
+        
+        postfix = {'✅': 0, '❌': 0, '🔄': 0, '线程': max_workers}
+        with self._progress_bar(total=0) as pbar:
+            
+            def on_done(future, video_file):
+                """任务完成回调（在工作线程中执行）"""
+                try:
+                    success, _, _ = future.result()
+                except Exception as e:
+                    self.logger.error("任务执行异常 %s: %s", video_file.name, e)
+                    success = False
+                    
+                with self._lock:
+                    if success:
+                        counts['success'] += 1
+                    counts['done'] += 1
+                        
+                    # 更新进度条（总数在扫描结束前未知，只按间隔刷新后缀）
+                    pbar.update(1)
+                    if self._postfix_due(pbar, counts['done'], None):
+                        self._update_postfix(pbar, postfix, counts['success'], counts['done'],
+                                             **{'🔄': stats['duplicates']})
+                pending.release()
+                
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                try:
+                    for video_file in self._iter_unique_video_files(directory, recursive, stats):
+                        pending.acquire()
+                        
+                        with self._lock:
+                            counts['total'] += 1
+                            pbar.total = counts['total']
+                            
+                        future = executor.submit(
+                            self._convert_single_task, video_file, output_directory, audio_format, bitrate,
+                            file_progress_callback=file_progress_callback,
+                            max_duration=max_duration,
+                            ffmpeg_threads=ffmpeg_threads
+                        )
+                        future.add_done_callback(functools.partial(on_done, video_file=video_file))
+                        
+                except Exception as e:
+                    self.logger.error("扫描目录时出错: %s", e)
+                    
+            # 所有任务已结束，补上最终统计
+            if not pbar.disable:
+                self._update_postfix(pbar, postfix, counts['success'], counts['done'],
+                                     **{'🔄': stats['duplicates']})
+                    
+        duplicate_count = stats['duplicates']
+        
+        self.logger.info("📋 扫描统计:")
+        self.logger.info("   总文件数: %s", stats['scanned'])
+        self.logger.info("   重复文件: %s", duplicate_count)
+        self.logger.info("   待处理文件: %s", counts['total'])
+        
+        if counts['total'] == 0:
+            self.logger.warning("没有找到任何需要处理的视频文件")
+        elif duplicate_count > 0:
+            print(f"\n🔄 检测到 {duplicate_count} 个重复文件，已跳过")
+            
+        return counts['success'], counts['total'], duplicate_count
 
 
 def print_banner():
@@ -933,9 +1950,10 @@ def main():
     )
     parser.add_argument(
         '-f', '--format', 
-        default='mp3',
+        nargs='+',
+        default=['mp3'],
         choices=['mp3', 'wav', 'aac', 'm4a', 'ogg', 'flac'],
-        help='输出音频格式 (默认: mp3)'
+        help='输出音频格式，可指定多个同时输出 (默认: mp3)'
     )
     parser.add_argument(
         '-q', '--quality', 
@@ -961,7 +1979,22 @@ def main():
     parser.add_argument(
         '-j', '--jobs', 
         type=int,
-        help='并发线程数 (默认使用配置文件中的设置，1表示单线程)'
+        help='并发线程数 (默认使用配置文件中的设置，未设置时为CPU核心数，1表示单线程)'
+    )
+    parser.add_argument(
+        '--hash-jobs', 
+        type=int,
+        help='重复检测时并行计算哈希的线程数，仅在先扫描完整个目录时使用 (默认使用配置文件中的设置，机械硬盘建议设为1)'
+    )
+    parser.add_argument(
+        '--dedup-mode', 
+        choices=['off', 'fast', 'strict'],
+        help='重复文件检测模式: off 不检测, fast 比较大小和采样内容, strict 比较完整内容 (默认使用配置文件中的设置)'
+    )
+    parser.add_argument(
+        '-v', '--verbose', 
+        action='store_true',
+        help='在控制台显示详细日志 (默认只显示警告和错误，完整日志见 logs/conversion.log)'
     )
     parser.add_argument(
         '--version', 
@@ -975,6 +2008,8 @@ def main():
     try:
         # 创建转换器实例
         converter = VideoAudioConverter(args.config)
+        if args.verbose:
+            converter._console_handler.setLevel(logging.INFO)
         
         # 处理输入路径（目录或文件）
         if args.input_dir:
@@ -997,26 +2032,30 @@ def main():
         
         # 更新配置（如果用户指定了覆盖选项）
         if args.overwrite:
-            converter.config.set('DEFAULT', 'overwrite_existing', 'true')
+            converter.set_config('overwrite_existing', 'true')
+        if args.hash_jobs:
+            converter.set_config('hash_jobs', str(args.hash_jobs))
+        if args.dedup_mode:
+            converter.set_config('dedup_mode', args.dedup_mode)
         
         # 显示操作信息
         input_path_obj = Path(input_path)
         if input_path_obj.is_file():
             print(f"� 输出入文件: {input_path}")
         else:
-            print(f"� 输入目录: {原input_path}")
+            print(f"� 输入目录: {input_path}")
             
         if output_directory:
             print(f"📁 输出目录: {output_directory}")
         else:
             print(f"📁 输出目录: 与原文件同目录")
-        print(f"🎵 输出格式: {args.format.upper()}")
+        print(f"🎵 输出格式: {', '.join(args.format).upper()}")
         print(f"🔊 音频质量: {args.quality}")
         print(f"📊 递归扫描: {'否' if args.no_recursive else '是'}")
         print(f"🔄 覆盖文件: {'是' if args.overwrite else '否'}")
         
         # 显示线程信息
-        max_workers = args.jobs if args.jobs else converter.config.getint('DEFAULT', 'max_concurrent_jobs', fallback=1)
+        max_workers = args.jobs if args.jobs else converter.settings.max_workers
         print(f"🧵 并发线程: {max_workers}")
         print("=" * 60)
         
@@ -14,7 +14,11 @@ from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
 import queue
 import os
+import stat
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 from pathlib import Path
 from video_audio_converter import VideoAudioConverter
 
@@ -22,6 +26,27 @@ from video_audio_converter import VideoAudioConverter
 class VideoAudioConverterGUI:
     """视频转音频转换器GUI界面"""
     
+    # 日志区域保留的最大行数，防止占用过多内存
+    MAX_LOG_LINES = 1000
+    # 支持的视频格式，与转换器使用同一份集合
+    SUPPORTED_VIDEO_EXTS = VideoAudioConverter.SUPPORTED_VIDEO_FORMATS
+    # 选择视频文件对话框的文件类型，"视频文件" 一项由上面的集合生成
+    VIDEO_DIALOG_FILETYPES = (
+        ("视频文件", "*" + ";*".join(sorted(SUPPORTED_VIDEO_EXTS))),
+        ("MP4文件", "*.mp4"),
+        ("AVI文件", "*.avi"),
+        ("MOV文件", "*.mov"),
+        ("所有文件", "*.*"),
+    )
+    # 进度事件最小间隔（秒），间隔内百分比变化不足 PROGRESS_MIN_STEP 的事件直接丢弃
+    PROGRESS_MIN_INTERVAL = 0.05
+    PROGRESS_MIN_STEP = 1.0
+    # 转换期间消息队列的轮询间隔（毫秒）；积压超过 QUEUE_BACKLOG 条时立即再处理，
+    # 空闲时按 QUEUE_IDLE_POLL_MS 慢速轮询，其他线程的日志也能显示出来
+    QUEUE_POLL_MS = 50
+    QUEUE_BACKLOG = 32
+    QUEUE_IDLE_POLL_MS = 500
+    
     def __init__(self, root):
         self.root = root
         self.root.title("🎬 VideoAudio Batch Converter v1.0.0")
@@ -50,9 +75,15 @@ class VideoAudioConverterGUI:
         self.conversion_thread = None
         self.is_converting = False
         self.stop_conversion = False
+        # 各显示变量最后一次设置的值（按Tk变量名），值未变化时不重复设置
+        self._var_values = {}
         
         # 创建消息队列用于线程间通信
         self.message_queue = queue.Queue()
+        # 创建Tk窗口的线程，只有这个线程可以直接操作界面组件
+        self._ui_thread = threading.get_ident()
+        # 已安排的下一次队列处理（after 返回的id）
+        self._queue_poll_id = None
         
         # 创建界面
         try:
@@ -267,33 +298,21 @@ class VideoAudioConverterGUI:
             
     def browse_input_file(self):
         """浏览输入视频文件"""
-        # 支持的视频格式
-        video_formats = [
-            ("视频文件", "*.mp4;*.avi;*.mov;*.wmv;*.flv;*.mkv;*.webm;*.mp4v;*.m4v;*.3gp;*.mpg;*.mpeg;*.m2v;*.vob;*.asf"),
-            ("MP4文件", "*.mp4"),
-            ("AVI文件", "*.avi"),
-            ("MOV文件", "*.mov"),
-            ("所有文件", "*.*")
-        ]
-        
         filename = filedialog.askopenfilename(
             title="选择视频文件",
-            filetypes=video_formats
+            filetypes=self.VIDEO_DIALOG_FILETYPES
         )
         if filename:
             # 验证是否为支持的视频格式
-            supported_formats = {'.mp4', '.avi', '.mov', '.wmv', '.flv', 
-                               '.mkv', '.webm', '.mp4v', '.m4v', '.3gp',
-                               '.mpg', '.mpeg', '.m2v', '.vob', '.asf'}
-            
-            file_ext = Path(filename).suffix.lower()
-            if file_ext in supported_formats:
+            file_path = Path(filename)
+            file_ext = file_path.suffix.lower()
+            if file_ext in self.SUPPORTED_VIDEO_EXTS:
                 self.input_path_var.set(filename)
-                self.log_message(f"✅ 已选择视频文件: {Path(filename).name}")
+                self.log_message(f"✅ 已选择视频文件: {file_path.name}")
             else:
                 messagebox.showerror("格式错误", 
                                    f"不支持的文件格式: {file_ext}\n"
-                                   f"支持的格式: {', '.join(sorted(supported_formats))}")
+                                   f"支持的格式: {', '.join(sorted(self.SUPPORTED_VIDEO_EXTS))}")
                 self.log_message(f"❌ 不支持的文件格式: {file_ext}")
             
     def browse_output_dir(self):
@@ -331,8 +350,8 @@ class VideoAudioConverterGUI:
             bitrate = config.get('DEFAULT', 'audio_bitrate', fallback='192k')
             self.quality_var.set(bitrate)
             
-            max_jobs = config.get('DEFAULT', 'max_concurrent_jobs', fallback='1')
-            self.threads_var.set(max_jobs)
+            # 与命令行一致：未配置时默认使用可用 CPU 数
+            self.threads_var.set(str(self.converter.settings.max_workers))
             
             self.overwrite_var.set(config.getboolean('DEFAULT', 'overwrite_existing', fallback=False))
             
@@ -342,20 +361,32 @@ class VideoAudioConverterGUI:
             self.log_message(f"⚠️ 配置文件加载失败: {e}")
             
     def log_message(self, message):
-        """添加日志消息"""
-        from datetime import datetime
+        """添加日志消息（可在任意线程调用，工作线程的日志经消息队列交给界面线程）"""
+        if threading.get_ident() != self._ui_thread:
+            # 不能在工作线程中调用Tk，由界面线程的轮询取出（空闲时最多延迟 QUEUE_IDLE_POLL_MS）
+            self.message_queue.put(("log", message))
+            return
+        self._log_message_ui(message)
+        
+    def _log_message_ui(self, message):
+        """在界面线程中直接写入日志"""
+        self._append_log(self._format_log_line(message))
+        
+    def _format_log_line(self, message):
+        """给日志消息加上时间戳"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        formatted_message = f"[{timestamp}] {message}\n"
+        return f"[{timestamp}] {message}\n"
         
-        self.log_text.insert(tk.END, formatted_message)
+    def _append_log(self, text):
+        """把已格式化的日志文本（可以是多行）插入日志区域"""
+        self.log_text.insert(tk.END, text)
         self.log_text.see(tk.END)
-        self.root.update_idletasks()
         
-        # 限制日志长度，防止占用过多内存
-        lines = self.log_text.get("1.0", tk.END).split('\n')
-        if len(lines) > 1000:  # 保留最近的1000行
-            self.log_text.delete("1.0", "100.0")
-            self.log_text.see(tk.END)
+        # 限制日志长度：直接从末尾索引得到行数，不把整个日志内容取回Python再分割
+        line_count = int(self.log_text.index('end-1c').split('.')[0])
+        if line_count > self.MAX_LOG_LINES:
+            # 只删除超出的最早几行
+            self.log_text.delete("1.0", f"{line_count - self.MAX_LOG_LINES + 1}.0")
         
     def clear_log(self):
         """清空日志"""
@@ -375,21 +406,20 @@ class VideoAudioConverterGUI:
             messagebox.showerror("错误", "请选择输入目录或文件")
             return False
             
-        if not os.path.exists(input_path):
+        # 一次 stat 同时判断路径是否存在以及是否为文件
+        try:
+            input_stat = os.stat(input_path)
+        except (OSError, ValueError):
             messagebox.showerror("错误", "输入路径不存在")
             return False
         
         # 如果是文件，验证格式
-        if os.path.isfile(input_path):
-            supported_formats = {'.mp4', '.avi', '.mov', '.wmv', '.flv', 
-                               '.mkv', '.webm', '.mp4v', '.m4v', '.3gp',
-                               '.mpg', '.mpeg', '.m2v', '.vob', '.asf'}
-            
+        if stat.S_ISREG(input_stat.st_mode):
             file_ext = Path(input_path).suffix.lower()
-            if file_ext not in supported_formats:
+            if file_ext not in self.SUPPORTED_VIDEO_EXTS:
                 messagebox.showerror("格式错误", 
                                    f"不支持的文件格式: {file_ext}\n"
-                                   f"支持的格式: {', '.join(sorted(supported_formats))}")
+                                   f"支持的格式: {', '.join(sorted(self.SUPPORTED_VIDEO_EXTS))}")
                 return False
             
         if not self.output_dir_var.get():
@@ -412,10 +442,10 @@ class VideoAudioConverterGUI:
         self.stop_conversion = False
         self.start_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
-        self.overall_progress_var.set(0)
+        self._set_if_changed(self.overall_progress_var, 0)
         self.current_progress_var.set(0)
-        self.progress_info_var.set("")
-        self.status_var.set("正在转换...")
+        self._set_if_changed(self.progress_info_var, "")
+        self._set_if_changed(self.status_var, "正在转换...")
         
         # 显示当前文件进度条（无论单文件还是批量都显示）
         self.current_progress_label.grid(row=2, column=0, sticky=tk.W, pady=(10, 5))
@@ -435,13 +465,14 @@ class VideoAudioConverterGUI:
         # 启动转换线程
         self.conversion_thread = threading.Thread(target=self.conversion_worker, daemon=True)
         self.conversion_thread.start()
+        self._start_queue_polling()
         
     def stop_conversion_func(self):
         """停止转换"""
         if self.is_converting:
             self.stop_conversion = True
             self.log_message("⏹️ 正在停止转换...")
-            self.status_var.set("正在停止...")
+            self._set_if_changed(self.status_var, "正在停止...")
             
     def conversion_worker(self):
         """转换工作线程"""
@@ -456,12 +487,13 @@ class VideoAudioConverterGUI:
             
             # 更新转换器配置
             if self.overwrite_var.get():
-                self.converter.config.set('DEFAULT', 'overwrite_existing', 'true')
+                self.converter.set_config('overwrite_existing', 'true')
             else:
-                self.converter.config.set('DEFAULT', 'overwrite_existing', 'false')
+                self.converter.set_config('overwrite_existing', 'false')
             
-            # 扫描文件
-            if os.path.isfile(input_path):
+            # 扫描文件（输入类型只判断一次）
+            is_file = os.path.isfile(input_path)
+            if is_file:
                 self.message_queue.put(("log", f"🔎 验证视频文件: {Path(input_path).name}"))
             else:
                 self.message_queue.put(("log", "🔎 正在扫描视频文件..."))
@@ -469,7 +501,7 @@ class VideoAudioConverterGUI:
             video_files = self.converter.scan_video_files(input_path, recursive)
             
             if not video_files:
-                if os.path.isfile(input_path):
+                if is_file:
                     self.message_queue.put(("log", "❌ 文件格式不支持或验证失败"))
                 else:
                     self.message_queue.put(("log", "❌ 没有找到视频文件"))
@@ -477,20 +509,48 @@ class VideoAudioConverterGUI:
                 return
                 
             total_files = len(video_files)
-            if os.path.isfile(input_path):
+            if is_file:
                 self.message_queue.put(("log", f"✅ 文件验证通过，准备转换"))
             else:
                 self.message_queue.put(("log", f"📋 找到 {total_files} 个视频文件"))
             
             # 开始转换
             success_count = 0
-            is_single_file = total_files == 1
+            skipped_count = 0
+            
+            # 并发数不超过文件数；多个FFmpeg同时运行时平分CPU线程
+            max_workers = max(1, min(max_workers, total_files))
+            ffmpeg_threads = self.converter._threads_per_ffmpeg(max_workers)
+            if max_workers > 1:
+                # 大文件先开始转换，最后不会只剩一个大文件在转换
+                video_files = self.converter._largest_first(video_files)
+            
+            # 多个文件同时转换时，当前文件进度只显示最近开始的那个文件（按完整路径区分同名文件）
+            current_path = None
+            
+            # 进度限流状态：上一次发出进度事件的时间、百分比和文件路径
+            last_ts = 0.0
+            last_pct = -1.0
+            last_path = None
+            # 上一次发出的显示内容（秒级时间、一位小数的百分比和文件名），相同时不重复格式化
+            last_key = None
             
             # 定义文件级进度回调函数（用于显示当前文件转换进度）
-            def file_progress_callback(filename, current_time, total_time, percentage):
-                if not self.stop_conversion:
-                    self.message_queue.put(("current_progress", percentage))
-                    self.message_queue.put(("current_file", filename))
+            def file_progress_callback(file_path, current_time, total_time, percentage):
+                nonlocal last_ts, last_pct, last_path, last_key
+                if not self.stop_conversion and file_path == current_path:
+                    key = (int(current_time), int(total_time), round(percentage, 1), file_path)
+                    if key == last_key:
+                        return
+                        
+                    # 限流：间隔太短且百分比变化很小的同文件事件直接丢弃，0% 和 100% 总是放行
+                    now = time.monotonic()
+                    if (0 < percentage < 100 and file_path == last_path
+                            and now - last_ts < self.PROGRESS_MIN_INTERVAL
+                            and abs(percentage - last_pct) < self.PROGRESS_MIN_STEP):
+                        return
+                    last_ts, last_pct, last_path = now, percentage, file_path
+                    last_key = key
                     
                     # 格式化时间显示
                     if total_time > 0 and current_time <= total_time:
@@ -498,58 +558,92 @@ class VideoAudioConverterGUI:
                         current_min, current_sec = divmod(int(current_time), 60)
                         total_min, total_sec = divmod(int(total_time), 60)
                         time_info = f"{current_min:02d}:{current_sec:02d} / {total_min:02d}:{total_sec:02d}"
-                        self.message_queue.put(("progress_info", 
-                                              f"转换进度: {percentage:.1f}% - {time_info}"))
+                        info = f"转换进度: {percentage:.1f}% - {time_info}"
                     elif current_time > 0:
                         # 只有当前处理时间，没有总时长
                         current_min, current_sec = divmod(int(current_time), 60)
                         time_info = f"已处理: {current_min:02d}:{current_sec:02d}"
-                        self.message_queue.put(("progress_info", 
-                                              f"转换进度: {percentage:.1f}% - {time_info}"))
+                        info = f"转换进度: {percentage:.1f}% - {time_info}"
                     else:
                         # 只显示百分比
-                        self.message_queue.put(("progress_info", 
-                                              f"转换进度: {percentage:.1f}%"))
+                        info = f"转换进度: {percentage:.1f}%"
+                    
+                    # 百分比、文件名、进度信息合并为一条消息，主线程一次性处理
+                    self.message_queue.put(("progress_tick", (percentage, Path(file_path).name, info)))
             
-            for i, video_file in enumerate(video_files):
+            def convert_task(index, video_file):
+                """在线程池中转换单个文件，用户停止后才开始的任务返回None表示已跳过"""
+                nonlocal current_path
+                # 用户停止后，已排队但还没开始的任务直接跳过
                 if self.stop_conversion:
-                    self.message_queue.put(("log", "⏹️ 用户停止了转换"))
-                    break
+                    return None
                     
-                # 更新总体进度
-                overall_progress = (i / total_files) * 100
-                self.message_queue.put(("overall_progress", overall_progress))
-                self.message_queue.put(("status", f"正在处理: {video_file.name}"))
-                self.message_queue.put(("log", f"📹 [{i+1}/{total_files}] {video_file.name}"))
+                name = video_file.name
+                current_path = str(video_file)
+                self.message_queue.put(("status", f"正在处理: {name}"))
+                self.message_queue.put(("log", f"📹 [{index}/{total_files}] {name}"))
                 
                 # 重置当前文件进度
-                self.message_queue.put(("current_progress", 0))
-                self.message_queue.put(("current_file", video_file.name))
-                self.message_queue.put(("progress_info", "正在初始化转换..."))
-                
-                # 定义单文件进度回调函数（仅单文件时使用，用于兼容性）
-                def progress_callback(current_time, total_time, percentage):
-                    if is_single_file and not self.stop_conversion:
-                        file_progress_callback(video_file.name, current_time, total_time, percentage)
+                self.message_queue.put(("progress_tick", (0, name, "正在初始化转换...")))
                 
-                # 转换单个文件
-                callback = progress_callback if is_single_file else None
-                success, _, audio_file = self.converter._convert_single_task(
-                    video_file, output_dir, audio_format, bitrate, callback, file_progress_callback
+                return self.converter._convert_single_task(
+                    video_file, output_dir, audio_format, bitrate, None, file_progress_callback,
+                    ffmpeg_threads=ffmpeg_threads
                 )
+            
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                future_to_file = {
+                    executor.submit(convert_task, i, video_file): video_file
+                    for i, video_file in enumerate(video_files, 1)
+                }
                 
-                if success:
-                    success_count += 1
-                    self.message_queue.put(("log", f"✅ 转换成功: {audio_file.name}"))
-                    self.message_queue.put(("current_progress", 100))
-                    self.message_queue.put(("progress_info", "转换完成!"))
-                else:
-                    self.message_queue.put(("log", f"❌ 转换失败: {video_file.name}"))
-                    self.message_queue.put(("progress_info", "转换失败"))
+                # 停止后不提前退出循环：被取消的任务也会在这里返回，正在转换的文件完成后照常计入统计
+                stop_handled = False
+                for done, future in enumerate(as_completed(future_to_file), 1):
+                    video_file = future_to_file[future]
+                    name = video_file.name
+                    if future.cancelled():
+                        result = None
+                    else:
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            self.message_queue.put(("log", f"❌ 转换出错: {name} - {e}"))
+                            result = (False, video_file, None)
+                        
+                    # 更新总体进度
+                    self.message_queue.put(("overall_progress", done / total_files * 100))
                     
-            # 完成
+                    if result is None:
+                        # 停止后没有开始转换的文件，不算失败
+                        skipped_count += 1
+                        continue
+                        
+                    success, _, audio_file = result
+                    if success:
+                        success_count += 1
+                        self.message_queue.put(("log", f"✅ 转换成功: {audio_file.name}"))
+                        if str(video_file) == current_path:
+                            self.message_queue.put(("progress_tick", (100, name, "转换完成!")))
+                    else:
+                        self.message_queue.put(("log", f"❌ 转换失败: {name}"))
+                        if str(video_file) == current_path:
+                            self.message_queue.put(("progress_info", "转换失败"))
+                            
+                    if self.stop_conversion and not stop_handled:
+                        # 取消还在排队的任务，正在运行的FFmpeg会转换完当前文件
+                        stop_handled = True
+                        for pending in future_to_file:
+                            pending.cancel()
+                        self.message_queue.put(("log", "⏹️ 用户停止了转换，等待正在转换的文件完成..."))
+                    
+            if skipped_count:
+                self.message_queue.put(("log", f"⏭️ 已取消 {skipped_count} 个未开始转换的文件"))
+                
+            # 完成（统计只包含实际开始转换的文件）
             self.message_queue.put(("overall_progress", 100))
-            self.message_queue.put(("complete", (success_count, total_files, len(self.converter.duplicate_files))))
+            self.message_queue.put(("complete", (success_count, total_files - skipped_count,
+                                                 len(self.converter.duplicate_files))))
             
         except Exception as e:
             self.message_queue.put(("log", f"❌ 转换过程出错: {e}"))
@@ -557,31 +651,74 @@ class VideoAudioConverterGUI:
             
     def process_queue(self):
         """处理消息队列"""
+        self._queue_poll_id = None
+        # 一次取空队列：同一个变量只保留最后的值，日志行合并后一次插入
+        latest = {}
+        log_batch = []
         try:
             while True:
                 message_type, data = self.message_queue.get_nowait()
                 
                 if message_type == "log":
-                    self.log_message(data)
-                elif message_type == "overall_progress":
-                    self.overall_progress_var.set(data)
-                elif message_type == "current_progress":
-                    self.current_progress_var.set(data)
-                elif message_type == "current_file":
-                    self.current_file_var.set(f"正在转换: {data}")
-                elif message_type == "progress_info":
-                    self.progress_info_var.set(data)
-                elif message_type == "status":
-                    self.status_var.set(data)
+                    log_batch.append(self._format_log_line(data))
+                elif message_type in ("overall_progress", "current_progress", "progress_info", "status"):
+                    latest[message_type] = data
+                elif message_type == "progress_tick":
+                    pct, fname, info = data
+                    latest["current_progress"] = pct
+                    latest["current_file"] = fname
+                    latest["progress_info"] = info
                 elif message_type == "complete":
+                    # 完成处理会重置显示并写入统计日志，先应用之前积累的更新以保持顺序
+                    self._flush_queue_updates(latest, log_batch)
                     success, total, duplicates = data
                     self.conversion_complete(success, total, duplicates)
                     
         except queue.Empty:
             pass
             
-        # 继续处理队列
-        self.root.after(100, self.process_queue)
+        self._flush_queue_updates(latest, log_batch)
+        
+        # 继续处理队列；转换已结束且队列为空时降为慢速轮询
+        if self.message_queue.qsize() > self.QUEUE_BACKLOG:
+            delay = 0
+        elif self.is_converting or not self.message_queue.empty():
+            delay = self.QUEUE_POLL_MS
+        else:
+            delay = self.QUEUE_IDLE_POLL_MS
+        self._queue_poll_id = self.root.after(delay, self.process_queue)
+        
+    def _start_queue_polling(self):
+        """取消等待中的慢速轮询，立即处理一次队列并切换到转换期间的轮询间隔（只在界面线程调用）"""
+        if self._queue_poll_id is not None:
+            self.root.after_cancel(self._queue_poll_id)
+        self.process_queue()
+        
+    def _flush_queue_updates(self, latest, log_batch):
+        """把 process_queue 积累的变量更新和日志行应用到界面，每个变量只设置一次"""
+        if "overall_progress" in latest:
+            self._set_if_changed(self.overall_progress_var, latest["overall_progress"])
+        if "current_progress" in latest:
+            self.current_progress_var.set(latest["current_progress"])
+        if "current_file" in latest:
+            self._set_if_changed(self.current_file_var, f"正在转换: {latest['current_file']}")
+        if "progress_info" in latest:
+            self._set_if_changed(self.progress_info_var, latest["progress_info"])
+        if "status" in latest:
+            self._set_if_changed(self.status_var, latest["status"])
+        latest.clear()
+        
+        if log_batch:
+            self._append_log("".join(log_batch))
+            log_batch.clear()
+        
+    def _set_if_changed(self, var, value):
+        """只在值变化时设置Tk变量，避免重复触发变量trace和重绘"""
+        name = str(var)
+        if name in self._var_values and self._var_values[name] == value:
+            return
+        self._var_values[name] = value
+        var.set(value)
         
     def conversion_complete(self, success, total, duplicates):
         """转换完成处理"""
@@ -590,16 +727,16 @@ class VideoAudioConverterGUI:
         self.stop_button.config(state=tk.DISABLED)
         
         # 清空当前文件显示
-        self.current_file_var.set("")
+        self._set_if_changed(self.current_file_var, "")
         self.current_progress_var.set(0)
         
         if self.stop_conversion:
-            self.status_var.set("已停止")
-            self.progress_info_var.set("转换已停止")
+            self._set_if_changed(self.status_var, "已停止")
+            self._set_if_changed(self.progress_info_var, "转换已停止")
             self.log_message("⏹️ 转换已停止")
         else:
-            self.status_var.set("转换完成")
-            self.progress_info_var.set(f"全部完成! 成功: {success}/{total}")
+            self._set_if_changed(self.status_var, "转换完成")
+            self._set_if_changed(self.progress_info_var, f"全部完成! 成功: {success}/{total}")
             self.log_message("🎉 转换完成!")
             
         # 显示统计信息